@@ -0,0 +1,128 @@
+"""
+Helpers shared by benchmark scripts.
+Scripts are run from backend directory: python -m benchmarks.<name>
+They use the same settings (.env) as services, so point them to scratch Redis, Postgres and Kafka
+"""
+import asyncio
+import json
+import time
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Percentile of sorted values by nearest rank
+    :param values: Sorted values
+    :param q: Percentile from 0 to 100
+    :return: float
+    """
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))
+    return values[index]
+
+
+def latency_summary(samples: list[float]) -> dict:
+    """
+    Summary of latencies
+    :param samples: Latencies in seconds
+    :return: dict: count and percentiles in milliseconds
+    """
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round((values[-1] if values else 0.0) * 1000, 3),
+    }
+
+
+async def measure(func, args_list: list[tuple]) -> list[float]:
+    """
+    Call coroutine function sequentially and collect latencies
+    :param func: Coroutine function
+    :param args_list: Arguments of every call
+    :return: list[float]: Latencies in seconds
+    """
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        await func(*args)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def print_table(title: str, rows: list[dict]):
+    """
+    Print rows with same keys as aligned table
+    :param title: Table title
+    :param rows: Rows
+    """
+    print(f"\n{title}")
+    if not rows:
+        print("  no data")
+        return
+    columns = list(rows[0])
+    widths = {column: max(len(column), *(len(str(row[column])) for row in rows)) for column in columns}
+    print("  " + "  ".join(column.rjust(widths[column]) for column in columns))
+    for row in rows:
+        print("  " + "  ".join(str(row[column]).rjust(widths[column]) for column in columns))
+
+
+class StandInServer:
+    """
+    Minimal HTTP/1.1 server with keep-alive answering every request with the same JSON.
+    Stands in for a neighbour service, so benchmarks measure client side only
+    """
+
+    def __init__(self, body: dict | None = None, latency_ms: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.body = json.dumps(body or {}).encode()
+        self.latency = latency_ms / 1000
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.requests = 0
+        self._server: asyncio.AbstractServer | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        # Закрываем keep-alive соединения, иначе их обработчики ждут следующий запрос
+        for writer in list(self._writers):
+            writer.close()
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                headers = {}
+                for line in head.decode("latin-1").split("\r\n")[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                if int(headers.get("content-length", 0)):
+                    await reader.readexactly(int(headers["content-length"]))
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: " + str(len(self.body)).encode() + b"\r\n\r\n" + self.body)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
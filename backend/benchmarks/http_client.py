@@ -0,0 +1,98 @@
+"""
+Requests per second of inter-service flows: client per call against shared pooled client.
+
+Neighbour services are replaced by local stand-in servers (one per service, so connections
+are reused per target). Every simulated request makes the same hops as the real handler:
+
+- login: authenticate user, get user sessions, create session
+- task_me: check auth, find user by email (remote path without local auth)
+
+    python -m benchmarks.http_client --concurrency 50 --duration 10 --latency-ms 1
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.common import StandInServer, latency_summary, print_table
+from src.shared.http_client import create_http_client
+
+# (метод, сервис, путь) - те же запросы, что делают обработчики
+FLOWS = {
+    "login": [
+        ("POST", "user", "/user/authenticate"),
+        ("GET", "session", "/session/crud/user"),
+        ("POST", "session", "/session/crud"),
+    ],
+    "task_me": [
+        ("GET", "auth", "/auth/check_auth"),
+        ("GET", "user", "/user/crud/search"),
+    ],
+}
+
+
+async def run_flow(hops: list[tuple[str, str]], client: httpx.AsyncClient | None):
+    for method, url in hops:
+        if client is None:
+            # Как было раньше: новый клиент и новое соединение на каждый запрос
+            async with httpx.AsyncClient() as fresh_client:
+                response = await fresh_client.request(method, url, json={} if method == "POST" else None)
+        else:
+            response = await client.request(method, url, json={} if method == "POST" else None)
+        response.raise_for_status()
+
+
+async def load(hops: list[tuple[str, str]], client: httpx.AsyncClient | None, concurrency: int,
+               duration: float) -> dict:
+    """
+    Run flow from concurrency workers during duration seconds
+    :return: dict: Requests per second and latencies of flows
+    """
+    samples = []
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await run_flow(hops, client)
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"rps": round(len(samples) / elapsed, 1), **latency_summary(samples)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per flow and mode")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="processing time of stand-in services")
+    args = parser.parse_args()
+
+    servers = {name: StandInServer(latency_ms=args.latency_ms) for name in ("auth", "user", "session")}
+    for server in servers.values():
+        await server.start()
+    rows = []
+    try:
+        for flow, steps in FLOWS.items():
+            hops = [(method, servers[service].url + path) for method, service, path in steps]
+            for mode in ("client per call", "shared client"):
+                client = create_http_client() if mode == "shared client" else None
+                connections = sum(server.connections for server in servers.values())
+                try:
+                    result = await load(hops, client, args.concurrency, args.duration)
+                finally:
+                    if client is not None:
+                        await client.aclose()
+                rows.append({"flow": flow, "mode": mode, **result,
+                             "connections": sum(server.connections for server in servers.values()) - connections})
+    finally:
+        for server in servers.values():
+            await server.stop()
+    print_table(f"Inter-service flows, concurrency {args.concurrency}", rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""
+Messages per second of Kafka sends: producer per message against shared producer.
+
+Sends reminder-sized messages to settings.kafka_broker. Use a local single-node broker
+(Kafka or Redpanda container) as stand-in, the topic is created by broker auto-creation.
+
+    python -m benchmarks.kafka_producer --messages 20000 --baseline-messages 200 --topic benchmark
+"""
+import argparse
+import asyncio
+import time
+
+from aiokafka import AIOKafkaProducer
+
+from benchmarks.common import print_table
+from src.shared.config import settings
+from src.shared.kafka_producer import create_kafka_producer, send_message, flush_kafka_producer, \
+    stop_kafka_producer
+
+
+def make_message(number: int) -> dict:
+    return {
+        "event": "task_due",
+        "user": number % 1000,
+        "tasks": [{"id": number, "title": f"Task {number}", "description": "Benchmark task", "status": 0,
+                   "userId": number % 1000, "fulfilledDate": "2025-01-01T00:00:00+00:00", "version": 0}],
+    }
+
+
+async def send_with_new_producer(topic: str, message: dict):
+    # Как было раньше: продюсер создается, запускается и останавливается на каждое сообщение
+    producer: AIOKafkaProducer = create_kafka_producer()
+    await producer.start()
+    try:
+        await producer.send_and_wait(topic, message)
+    finally:
+        await producer.stop()
+
+
+async def run(name: str, send, messages: int) -> dict:
+    started = time.perf_counter()
+    for number in range(messages):
+        await send(number)
+    await flush_kafka_producer()
+    elapsed = time.perf_counter() - started
+    return {"mode": name, "messages": messages, "msg_per_s": round(messages / elapsed, 1),
+            "seconds": round(elapsed, 2)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--baseline-messages", type=int, default=200, help="messages for producer per message")
+    parser.add_argument("--topic", default="benchmark")
+    args = parser.parse_args()
+
+    rows = []
+    try:
+        rows.append(await run("producer per message", lambda number: send_with_new_producer(
+            args.topic, make_message(number)), args.baseline_messages))
+        rows.append(await run("shared, await delivery", lambda number: send_message(
+            args.topic, make_message(number), fire_and_forget=False, key=str(number % 1000)), args.messages))
+        rows.append(await run("shared, fire and forget", lambda number: send_message(
+            args.topic, make_message(number), fire_and_forget=True, key=str(number % 1000)), args.messages))
+    finally:
+        await stop_kafka_producer()
+    print_table(f"Kafka sends to {settings.kafka_broker}, linger {settings.kafka_producer_linger_ms} ms, "
+                f"compression {settings.kafka_producer_compression_type or 'none'}, "
+                f"acks {settings.kafka_producer_acks}", rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Concurrent logins per core: bcrypt in event loop against password executor.
+
+Runs concurrent verify_password calls, as logins do, and measures logins per second,
+logins per second per core and event loop lag, which shows how long other requests wait.
+
+    python -m benchmarks.password_hashing --logins 200 --concurrency 50 --executor thread
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import latency_summary, print_table
+from src.shared.config import settings
+from src.user_service import auth_functions
+
+PASSWORD = "Benchmark1!"
+LAG_INTERVAL = 0.01
+
+
+async def verify_in_loop(plain_password, hashed_password):
+    # Как было раньше: bcrypt прямо в обработчике
+    return auth_functions.pwd_context.verify(plain_password, hashed_password)
+
+
+async def watch_lag(samples: list[float], stop: asyncio.Event):
+    """
+    Measure how late event loop wakes up after sleep
+    """
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(time.perf_counter() - started - LAG_INTERVAL)
+
+
+async def run_logins(verify, hashed_password: str, logins: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    lag_samples, stop = [], asyncio.Event()
+
+    async def login():
+        async with semaphore:
+            assert await verify(PASSWORD, hashed_password)
+
+    watcher = asyncio.create_task(watch_lag(lag_samples, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await watcher
+    lag = latency_summary(lag_samples)
+    return {
+        "logins_per_s": round(logins / elapsed, 1),
+        "per_core": round(logins / elapsed / (os.cpu_count() or 1), 1),
+        "loop_lag_p99_ms": lag["p99_ms"],
+        "loop_lag_max_ms": lag["max_ms"],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--executor", choices=["thread", "process"], default=settings.password_executor)
+    parser.add_argument("--workers", type=int, default=settings.password_executor_workers)
+    args = parser.parse_args()
+
+    # Исполнитель создается при первом использовании, поэтому настройки можно поменять здесь
+    settings.password_executor = args.executor
+    settings.password_executor_workers = args.workers
+    hashed_password = auth_functions.pwd_context.hash(PASSWORD)
+    rows = []
+    try:
+        rows.append({"mode": "event loop", **await run_logins(verify_in_loop, hashed_password,
+                                                              args.logins, args.concurrency)})
+        rows.append({"mode": f"{args.executor} executor x{args.workers}", **await run_logins(
+            auth_functions.verify_password, hashed_password, args.logins, args.concurrency)})
+    finally:
+        auth_functions.shutdown_password_executor()
+    print_table(f"Concurrent logins, {os.cpu_count()} cores, concurrency {args.concurrency}", rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
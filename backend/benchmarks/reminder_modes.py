@@ -0,0 +1,62 @@
+"""
+Chunk processing time and worker CPU of reminder chunk in sync and async worker modes.
+
+Seeds users with overdue tasks, then processes the same chunk with process_users_chunk (sync)
+and run_users_chunk_async (async). Reminder dedup is disabled so both modes send every reminder,
+reminders go to --topic instead of the real reminder topic.
+
+    python -m benchmarks.reminder_modes --users 10000 --tasks-per-user 10 --rounds 3
+"""
+import argparse
+import time
+
+from benchmarks import seed
+from benchmarks.common import print_table
+from src.async_tasks.async_worker_logic import run_users_chunk_async, shutdown_async_worker
+from src.async_tasks.worker_logic import process_users_chunk
+from src.shared.config import settings
+
+
+def run(name: str, process_chunk, first_user_id: int, last_user_id: int, rounds: int) -> dict:
+    wall, cpu = [], []
+    for _ in range(rounds):
+        started, started_cpu = time.perf_counter(), time.process_time()
+        process_chunk(first_user_id, last_user_id)
+        wall.append(time.perf_counter() - started)
+        cpu.append(time.process_time() - started_cpu)
+    return {"mode": name, "best_s": round(min(wall), 2), "mean_s": round(sum(wall) / rounds, 2),
+            "cpu_s": round(sum(cpu) / rounds, 2), "cpu_share": f"{sum(cpu) / sum(wall):.0%}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--tasks-per-user", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--topic", default="benchmark_task_remind")
+    parser.add_argument("--reuse", action="store_true", help="use already seeded data and keep it")
+    args = parser.parse_args()
+
+    settings.task_remind_dedup_seconds = 0
+    settings.kafka_task_remind_topic_name = args.topic
+    seed.create_schema()
+    first_user_id, last_user_id, count = seed.seeded_users()
+    if not (args.reuse and count):
+        seed.remove_seeded_data()
+        first_user_id, last_user_id = seed.seed_users(args.users)
+        seed.seed_tasks(first_user_id, last_user_id, args.tasks_per_user)
+
+    rows = []
+    try:
+        rows.append(run("sync", process_users_chunk, first_user_id, last_user_id, args.rounds))
+        rows.append(run("async", run_users_chunk_async, first_user_id, last_user_id, args.rounds))
+    finally:
+        shutdown_async_worker()
+        if not args.reuse:
+            seed.remove_seeded_data()
+    print_table(f"Reminder chunk of {last_user_id - first_user_id + 1} users, "
+                f"batch {settings.task_remind_yield_per}", rows)
+
+
+if __name__ == "__main__":
+    main()
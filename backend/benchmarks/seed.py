@@ -0,0 +1,85 @@
+"""
+Synthetic users and tasks for benchmarks, generated inside Postgres with generate_series.
+Benchmark users have emails in BENCHMARK_DOMAIN and are removed by remove_seeded_data
+"""
+from sqlalchemy import create_engine, text
+
+from src.shared.config import settings
+from src.shared.models import Base
+
+BENCHMARK_DOMAIN = "benchmark.local"
+WORDS = ["buy", "milk", "report", "meeting", "call", "doctor", "project", "review", "deploy", "invoice",
+         "groceries", "birthday", "gym", "flight", "hotel", "budget", "design", "release", "interview", "dentist",
+         "kafka", "postgres", "redis", "backup", "garden", "laundry", "homework", "taxes", "insurance", "present"]
+
+engine = create_engine(settings.postgres_db.replace("+asyncpg", "+psycopg2"))
+
+
+def create_schema():
+    # create_all создает только отсутствующие таблицы
+    Base.metadata.create_all(engine)
+
+
+def seeded_users() -> tuple[int, int, int]:
+    """
+    Id range of seeded users
+    :return: (first user id, last user id, count), count 0 if nothing is seeded
+    """
+    with engine.connect() as connection:
+        first, last, count = connection.execute(
+            text("SELECT min(id), max(id), count(*) FROM users WHERE email LIKE :pattern"),
+            {"pattern": f"%@{BENCHMARK_DOMAIN}"},
+        ).one()
+    return first or 0, last or 0, count
+
+
+def seed_users(count: int) -> tuple[int, int]:
+    """
+    Insert benchmark users
+    :param count: Number of users
+    :return: (first user id, last user id)
+    """
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO users (email, username, first_name, last_name, hashed_password, is_active, is_superuser, "
+            "version) SELECT 'bench' || g || '@' || :domain, 'bench' || g || '.' || :domain, 'Bench', 'User', "
+            "'-', true, false, 0 FROM generate_series(1, :count) g"
+        ), {"domain": BENCHMARK_DOMAIN, "count": count})
+    first, last, _ = seeded_users()
+    return first, last
+
+
+def seed_tasks(first_user_id: int, last_user_id: int, tasks_per_user: int, completed_every: int = 0,
+               overdue: bool = True):
+    """
+    Insert tasks with titles and descriptions from WORDS
+    :param first_user_id: First user id
+    :param last_user_id: Last user id
+    :param tasks_per_user: Tasks of every user
+    :param completed_every: Every n-th task is completed, 0 - all tasks are in progress
+    :param overdue: Due dates in the past, otherwise spread around now
+    """
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO tasks (title, description, status, user_id, fulfilled_date, version) "
+            "SELECT w[1 + (g * 7 + u.id) % n] || ' ' || w[1 + (g * 13 + u.id * 3) % n], "
+            "'Remember about ' || w[1 + (g * 17 + u.id * 5) % n] || ' and ' || w[1 + (g * 19 + u.id) % n], "
+            "(CASE WHEN :completed_every > 0 AND g % :completed_every = 0 "
+            "THEN 'COMPLETED' ELSE 'IN_PROGRESS' END)::taskstatus, u.id, "
+            "now() - (CASE WHEN :overdue THEN 1 ELSE (g % 3) - 1 END) * ((g % 720) || ' hours')::interval, 0 "
+            "FROM users u CROSS JOIN generate_series(1, :per_user) g "
+            "CROSS JOIN (SELECT CAST(:words AS text[]) AS w, CAST(:word_count AS int) AS n) words "
+            "WHERE u.id BETWEEN :first AND :last AND u.email LIKE :pattern"
+        ), {"completed_every": completed_every, "overdue": overdue, "per_user": tasks_per_user,
+            "words": WORDS, "word_count": len(WORDS), "first": first_user_id, "last": last_user_id,
+            "pattern": f"%@{BENCHMARK_DOMAIN}"})
+        connection.execute(text("ANALYZE tasks"))
+
+
+def remove_seeded_data():
+    with engine.begin() as connection:
+        for table in ("task_deletions", "tasks"):
+            connection.execute(text(
+                f"DELETE FROM {table} WHERE user_id IN (SELECT id FROM users WHERE email LIKE :pattern)"
+            ), {"pattern": f"%@{BENCHMARK_DOMAIN}"})
+        connection.execute(text("DELETE FROM users WHERE email LIKE :pattern"), {"pattern": f"%@{BENCHMARK_DOMAIN}"})
@@ -0,0 +1,103 @@
+"""
+Session lookup latency by access token: token index against keyspace scan.
+
+Fills Redis with synthetic sessions in the layout of create_and_store_session,
+measures get_session_by_token and the previous scan_iter("session:*") lookup, then removes the sessions.
+
+    python -m benchmarks.session_lookup --sizes 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import random
+import uuid
+
+from benchmarks.common import latency_summary, measure, print_table
+from src.session_service.crud import get_session_by_token, token_index_key, _index_session_tokens, \
+    SESSION_OWNERS_KEY
+from src.session_service.redis_base import redis_client
+
+# Пользователи бенчмарка не пересекаются с настоящими
+FIRST_USER_ID = 10 ** 9
+USERS = 10000
+FILL_BATCH = 10000
+SESSION_TTL = 3600
+
+
+async def fill_sessions(sessions: list[dict], count: int):
+    """
+    Add synthetic sessions until there are count of them
+    :param sessions: Created sessions, new ones are appended
+    :param count: Required number of sessions
+    """
+    while len(sessions) < count:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for _ in range(min(FILL_BATCH, count - len(sessions))):
+                session_data = {
+                    "session_id": str(uuid.uuid4()),
+                    "user_id": FIRST_USER_ID + len(sessions) % USERS,
+                    "access_token": uuid.uuid4().hex,
+                    "refresh_token": uuid.uuid4().hex,
+                    "device": "benchmark",
+                    "ip_address": "127.0.0.1",
+                    "created_at": "2025-01-01T00:00:00",
+                    "expires_at": "2099-01-01T00:00:00",
+                }
+                pipe.hset(f"session:{session_data['session_id']}", mapping=session_data)
+                pipe.expire(f"session:{session_data['session_id']}", SESSION_TTL)
+                pipe.sadd(f"user:{session_data['user_id']}:sessions", session_data["session_id"])
+                pipe.hset(SESSION_OWNERS_KEY, session_data["session_id"], session_data["user_id"])
+                _index_session_tokens(pipe, session_data, SESSION_TTL)
+                sessions.append(session_data)
+            await pipe.execute()
+
+
+async def remove_sessions(sessions: list[dict]):
+    for start in range(0, len(sessions), FILL_BATCH):
+        batch = sessions[start:start + FILL_BATCH]
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for session_data in batch:
+                pipe.delete(f"session:{session_data['session_id']}",
+                            token_index_key(session_data["access_token"]),
+                            token_index_key(session_data["refresh_token"], "refresh_token"))
+            pipe.hdel(SESSION_OWNERS_KEY, *[session_data["session_id"] for session_data in batch])
+            await pipe.execute()
+    await redis_client.delete(*[f"user:{FIRST_USER_ID + user}:sessions" for user in range(USERS)])
+
+
+async def scan_lookup(token: str) -> dict | None:
+    """
+    Lookup used before token index: scan all sessions and read each of them
+    """
+    async for key in redis_client.scan_iter("session:*"):
+        session_data = await redis_client.hgetall(key)
+        if session_data.get("access_token") == token:
+            return session_data
+    return None
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--lookups", type=int, default=1000, help="index lookups per size")
+    parser.add_argument("--scan-lookups", type=int, default=3, help="scan lookups per size")
+    parser.add_argument("--scan-max-size", type=int, default=100000, help="skip scan above this size")
+    args = parser.parse_args()
+
+    sessions, rows = [], []
+    try:
+        for size in sorted(args.sizes):
+            await fill_sessions(sessions, size)
+            tokens = [(random.choice(sessions)["access_token"],) for _ in range(args.lookups)]
+            rows.append({"sessions": size, "lookup": "index", **latency_summary(
+                await measure(get_session_by_token, tokens))})
+            if size <= args.scan_max_size:
+                rows.append({"sessions": size, "lookup": "scan", **latency_summary(
+                    await measure(scan_lookup, tokens[:args.scan_lookups]))})
+    finally:
+        await remove_sessions(sessions)
+        await redis_client.close()
+    print_table("get_session_by_token latency", rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Reconnect storm load test: opens many concurrent socket.io connections to a running task service.
+
+Session service is replaced by a local stand-in answering every session lookup, so connect
+authentication is served by local token check, session cache and one stand-in request per token.
+Start task service with SESSION_SERVICE_URL pointing to the stand-in and the same JWT settings, then run:
+
+    SESSION_SERVICE_URL=http://127.0.0.1:18001 uvicorn src.task_service.main:app --port 8003
+    python -m benchmarks.socket_connect --url ws://127.0.0.1:8003 --sockets 10000
+
+Connections refused by connect rate limit are retried with backoff like real clients do.
+Raise open files limit (ulimit -n) for both processes before opening 10k sockets.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+
+from websockets.asyncio.client import connect
+
+from benchmarks.common import StandInServer, latency_summary, print_table
+from src.auth_service.auth_functions import create_new_token
+
+# Клиенты бенчмарка не пересекаются с настоящими пользователями
+FIRST_USER_ID = 10 ** 9
+
+
+async def open_socket(url: str, token: str, hold: float, retries: int, results: Counter, latencies: list[float]):
+    """
+    Open socket.io connection over websocket transport and keep it until hold ends
+    """
+    for attempt in range(retries + 1):
+        started = time.perf_counter()
+        try:
+            async with connect(f"{url}/socket.io/?EIO=4&transport=websocket",
+                               additional_headers={"Authorization": f"Bearer {token}"},
+                               open_timeout=30, max_queue=None) as websocket:
+                opening = await websocket.recv()
+                if not opening.startswith("0"):
+                    results["bad_handshake"] += 1
+                    return
+                await websocket.send("40")
+                while True:
+                    packet = await asyncio.wait_for(websocket.recv(), 30)
+                    if packet.startswith("40"):
+                        break
+                    if packet.startswith("44"):
+                        raise ConnectionRefusedError(packet[2:])
+                latencies.append(time.perf_counter() - started)
+                results["connected"] += 1
+                await keep_alive(websocket, hold, results)
+                return
+        except ConnectionRefusedError:
+            results["refused"] += 1
+            # Как настоящий клиент: повтор после случайной паузы
+            await asyncio.sleep(random.uniform(1, 2 ** min(attempt + 1, 5)))
+        except Exception as e:
+            results[f"error {type(e).__name__}"] += 1
+            return
+    results["gave_up"] += 1
+
+
+async def keep_alive(websocket, hold: float, results: Counter):
+    """
+    Answer engine.io pings until hold ends, count disconnects by server
+    """
+    deadline = time.perf_counter() + hold
+    while (timeout := deadline - time.perf_counter()) > 0:
+        try:
+            packet = await asyncio.wait_for(websocket.recv(), timeout)
+        except asyncio.TimeoutError:
+            return
+        if packet == "2":
+            await websocket.send("3")
+        elif packet.startswith("41") or packet == "1":
+            results["disconnected_by_server"] += 1
+            return
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="ws://127.0.0.1:8003")
+    parser.add_argument("--sockets", type=int, default=10000)
+    parser.add_argument("--hold", type=float, default=30.0, help="seconds to keep sockets open")
+    parser.add_argument("--retries", type=int, default=5, help="retries of refused connects")
+    parser.add_argument("--stand-in-port", type=int, default=18001)
+    args = parser.parse_args()
+
+    session = {"session_id": "benchmark", "user_id": FIRST_USER_ID, "access_token": "benchmark",
+               "device": "benchmark", "ip_address": "127.0.0.1",
+               "created_at": "2025-01-01T00:00:00", "expires_at": "2099-01-01T00:00:00"}
+    session_service = StandInServer(body=session, port=args.stand_in_port)
+    await session_service.start()
+    tokens = [create_new_token(f"bench{number}@benchmark.local", user_id=FIRST_USER_ID + number)
+              for number in range(args.sockets)]
+
+    results, latencies = Counter(), []
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(open_socket(args.url, token, args.hold, args.retries, results, latencies)
+                               for token in tokens))
+    finally:
+        await session_service.stop()
+    elapsed = time.perf_counter() - started - args.hold
+
+    print_table(f"{args.sockets} concurrent sockets to {args.url}", [{
+        **{key: results[key] for key in ("connected", "refused", "gave_up", "disconnected_by_server")},
+        "session_requests": session_service.requests,
+        "storm_s": round(elapsed, 1),
+        **latency_summary(latencies),
+    }])
+    errors = {key: value for key, value in results.items() if key.startswith("error") or key == "bad_handshake"}
+    if errors:
+        print(f"  errors: {json.dumps(errors)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
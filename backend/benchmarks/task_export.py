@@ -0,0 +1,73 @@
+"""
+Throughput and memory of streaming task export.
+
+Seeds one user with --rows tasks and consumes export_tasks for NDJSON and CSV like StreamingResponse does.
+Second pass of each format traces Python allocations to show that peak memory depends on chunk size only.
+
+    python -m benchmarks.task_export --rows 1000000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from benchmarks import seed
+from benchmarks.common import print_table
+from src.shared.config import settings
+from src.shared.database import engine
+from src.task_service.export import export_tasks
+from src.task_service.schemas import ExportFormat
+
+
+async def consume(export_format: ExportFormat, user_id: int) -> tuple[int, int, float]:
+    """
+    Read whole export
+    :return: (rows, bytes, seconds)
+    """
+    rows, size = 0, 0
+    started = time.perf_counter()
+    async for chunk in export_tasks(export_format, user_id):
+        size += len(chunk)
+        rows += chunk.count(b"\n")
+    return rows, size, time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--reuse", action="store_true", help="use already seeded data and keep it")
+    args = parser.parse_args()
+
+    seed.create_schema()
+    user_id, _, count = seed.seeded_users()
+    if not (args.reuse and count):
+        seed.remove_seeded_data()
+        user_id, _ = seed.seed_users(1)
+        seed.seed_tasks(user_id, user_id, args.rows, completed_every=3, overdue=False)
+
+    results = []
+    try:
+        for export_format in ExportFormat:
+            rows, size, elapsed = await consume(export_format, user_id)
+            tracemalloc.start()
+            await consume(export_format, user_id)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append({
+                "format": export_format.value,
+                "rows": rows - (export_format == ExportFormat.CSV),
+                "mb": round(size / 2 ** 20, 1),
+                "rows_per_s": round(rows / elapsed),
+                "mb_per_s": round(size / 2 ** 20 / elapsed, 1),
+                "seconds": round(elapsed, 2),
+                "peak_traced_mb": round(peak / 2 ** 20, 1),
+            })
+    finally:
+        await engine.dispose()
+        if not args.reuse:
+            seed.remove_seeded_data()
+    print_table(f"Task export, chunk {settings.task_export_chunk_size} rows", results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
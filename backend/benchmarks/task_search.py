@@ -0,0 +1,88 @@
+"""
+Latency of ranked full-text task search on a seeded table.
+
+Seeds --users users with --tasks-per-user tasks each (5M by default), then runs search_tasks for random
+users with prefix queries built from seed words: one prefix, two words, with status and date filters
+and the second page through cursor.
+
+    python -m benchmarks.task_search --users 5000 --tasks-per-user 1000 --queries 500
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import seed
+from benchmarks.common import latency_summary, print_table
+from src.shared.database import SessionLocal, engine
+from src.shared.models import TaskStatus
+from src.task_service import crud
+
+PAGE_SIZE = 20
+
+
+def make_query(kind: str) -> tuple[str, dict]:
+    """
+    Build search text and filters
+    :param kind: Query kind
+    :return: (text, search_tasks keyword arguments)
+    """
+    first, second = random.sample(seed.WORDS, 2)
+    if kind == "prefix":
+        return first[:3], {}
+    if kind == "two words":
+        return f"{first} {second[:4]}", {}
+    if kind == "prefix + status":
+        return first[:3], {"status": TaskStatus.IN_PROGRESS}
+    now = datetime.now(timezone.utc)
+    return first[:3], {"fulfilled_from": now - timedelta(days=7), "fulfilled_to": now + timedelta(days=7)}
+
+
+async def search(user_id: int, text: str, filters: dict, second_page: bool) -> int:
+    async with SessionLocal() as db:
+        tasks, cursor = await crud.search_tasks(db, user_id, text, PAGE_SIZE, **filters)
+    if second_page and cursor:
+        async with SessionLocal() as db:
+            tasks, _ = await crud.search_tasks(db, user_id, text, PAGE_SIZE, crud.decode_search_cursor(cursor),
+                                               **filters)
+    return len(tasks)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--tasks-per-user", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=500, help="queries per kind")
+    parser.add_argument("--reuse", action="store_true", help="use already seeded data and keep it")
+    args = parser.parse_args()
+
+    seed.create_schema()
+    first_user_id, last_user_id, count = seed.seeded_users()
+    if not (args.reuse and count):
+        seed.remove_seeded_data()
+        first_user_id, last_user_id = seed.seed_users(args.users)
+        seed.seed_tasks(first_user_id, last_user_id, args.tasks_per_user, completed_every=4, overdue=False)
+
+    rows = []
+    try:
+        for kind in ("prefix", "two words", "prefix + status", "prefix + dates"):
+            for second_page in (False, True):
+                samples, found = [], 0
+                for _ in range(args.queries):
+                    text, filters = make_query(kind)
+                    started = time.perf_counter()
+                    found += await search(random.randint(first_user_id, last_user_id), text, filters, second_page)
+                    samples.append(time.perf_counter() - started)
+                rows.append({"query": kind, "pages": 2 if second_page else 1,
+                             "avg_found": round(found / args.queries, 1), **latency_summary(samples)})
+    finally:
+        await engine.dispose()
+        if not args.reuse:
+            seed.remove_seeded_data()
+    print_table(f"search_tasks latency, {last_user_id - first_user_id + 1} users, page {PAGE_SIZE}, "
+                f"pages 2 - first page and next page by cursor", rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
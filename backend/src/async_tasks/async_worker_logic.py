@@ -0,0 +1,138 @@
+import asyncio
+
+import redis.asyncio as aioredis
+
+from src.async_tasks.worker_logic import due_tasks_statement, get_ledger_keys, build_reminders, \
+    record_reminders, get_worker_loop, shutdown_worker_loop
+from src.shared.config import settings
+from src.shared.database import SessionLocal, engine
+from src.shared.kafka_producer import send_message, flush_kafka_producer
+from src.shared.logger_setup import setup_logger
+from src.shared.schemas import TaskDTO
+
+logger = setup_logger(__name__)
+
+# Клиент создается в event loop воркера и живет вместе с ним
+_redis_client: aioredis.Redis | None = None
+
+
+def get_async_redis_client() -> aioredis.Redis:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = aioredis.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            password=settings.redis_password,
+            db=settings.redis_db,
+            decode_responses=True,
+        )
+    return _redis_client
+
+
+async def send_reminders_async(batch: list[tuple[int, list[dict]]], stats: dict[str, int]):
+    """
+    Send reminders for batch of users concurrently, skipping tasks already reminded within dedup window
+    :param batch: list of (user_id, tasks)
+    :param stats: Counters of sent and suppressed reminders
+    :return: list[dict]: Messages which were not sent
+    """
+    redis_client = get_async_redis_client()
+    ledger_keys = get_ledger_keys(batch)
+    reminded = set()
+    if settings.task_remind_dedup_seconds:
+        keys = list(ledger_keys.values())
+        reminded = {key for key, reminded_at in zip(keys, await redis_client.mget(keys)) if reminded_at}
+
+    messages, suppressed = build_reminders(batch, ledger_keys, reminded)
+    results = await asyncio.gather(
+        *(send_message(settings.kafka_task_remind_topic_name, message, key=str(message["user"]))
+          for message in messages),
+        return_exceptions=True
+    )
+    sent_messages, unsent_messages = [], []
+    for message, result in zip(messages, results):
+        if isinstance(result, Exception):
+            logger.error("Failed to send to Kafka for user %s: %s", message["user"], str(result))
+            unsent_messages.append(message)
+        else:
+            sent_messages.append(message)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        record_reminders(pipe, sent_messages, ledger_keys, suppressed, stats)
+        await pipe.execute()
+    return unsent_messages
+
+
+async def process_users_chunk_async(first_user_id, last_user_id, window_start=None, window_end=None):
+    """
+    Асинхронная обработка чанка пользователей с id из [first_user_id, last_user_id].
+    Пока отправляется одна пачка напоминаний, из базы читается следующая
+    """
+    stats = {"sent": 0, "suppressed": 0}
+    unsent = 0
+    sending: asyncio.Task | None = None
+
+    async def flush_batch(batch):
+        nonlocal sending, unsent
+        if sending:
+            unsent += len(await sending)
+        sending = asyncio.create_task(send_reminders_async(batch, stats))
+
+    try:
+        logger.info("Processing chunk of users %s..%s", first_user_id, last_user_id)
+        async with SessionLocal() as session:
+            tasks = await session.stream_scalars(
+                due_tasks_statement(first_user_id, last_user_id, window_start, window_end))
+            batch, batch_size = [], 0
+            user_id, user_tasks = None, []
+            async for task in tasks:
+                if task.user_id != user_id and user_tasks:
+                    batch.append((user_id, user_tasks))
+                    batch_size += len(user_tasks)
+                    user_tasks = []
+                    if batch_size >= settings.task_remind_yield_per:
+                        await flush_batch(batch)
+                        batch, batch_size = [], 0
+                user_id = task.user_id
+                user_tasks.append(TaskDTO(**task.to_dict()).model_dump(mode="json"))
+            if user_tasks:
+                batch.append((user_id, user_tasks))
+            if batch:
+                await flush_batch(batch)
+        if sending:
+            unsent += len(await sending)
+        await flush_kafka_producer()
+        logger.info("Chunk %s..%s reminders: %s", first_user_id, last_user_id, stats)
+        # Ошибка чанка не дает chord сдвинуть границу, неотправленные напоминания попадут в следующий запуск
+        if unsent:
+            raise RuntimeError(f"{unsent} reminders were not sent")
+        return f"Processed chunk {first_user_id}..{last_user_id}, reminders {stats}"
+
+    except Exception as e:
+        if sending and not sending.done():
+            sending.cancel()
+        logger.error(f"Error in chunk {first_user_id}..{last_user_id}: {str(e)}")
+        raise
+
+
+def run_users_chunk_async(first_user_id, last_user_id, window_start=None, window_end=None):
+    """Запуск асинхронной обработки чанка в event loop процесса воркера"""
+    return get_worker_loop().run_until_complete(
+        process_users_chunk_async(first_user_id, last_user_id, window_start, window_end))
+
+
+async def _close_async_resources():
+    global _redis_client
+    if _redis_client is not None:
+        await _redis_client.close()
+        _redis_client = None
+    await engine.dispose()
+
+
+def shutdown_async_worker(**kwargs):
+    """Закрывает соединения асинхронного режима и event loop воркера"""
+    loop = get_worker_loop()
+    try:
+        loop.run_until_complete(_close_async_resources())
+    except Exception as e:
+        logger.error("Failed to close async worker resources: %s", str(e))
+    shutdown_worker_loop()
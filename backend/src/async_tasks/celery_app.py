@@ -11,17 +11,34 @@ app = Celery(
     backend=f'redis://:{settings.redis_password}@{settings.redis_host}:{settings.redis_port}/{settings.redis_db}'
 )
 
+remind_schedule = {
+    'process-tasks': {
+        'task': 'src.async_tasks.tasks.dispatch_chunks',  # Указываем задачу-диспетчер
+        'schedule': timedelta(hours=settings.task_remind_timer_hours, minutes=settings.task_remind_timer_minutes,
+                              seconds=settings.task_remind_timer_seconds),
+        'args': (),  # Пустые аргументы, так как dispatch_chunks не принимает параметров
+    },
+} if settings.task_remind_mode != "schedule" else {
+    # Режим расписания: забираем только задачи, срок которых наступил
+    'poll-due-tasks': {
+        'task': 'src.async_tasks.tasks.poll_due_tasks',
+        'schedule': timedelta(seconds=settings.task_remind_poll_seconds),
+        'args': (),
+    },
+}
+
 app.conf.update(
     pool="solo",
     task_serializer='json',
     result_serializer='json',
     timezone='UTC',
     beat_schedule={
-        'process-tasks': {
-            'task': 'src.async_tasks.tasks.dispatch_chunks',  # Указываем задачу-диспетчер
-            'schedule': timedelta(hours=settings.task_remind_timer_hours, minutes=settings.task_remind_timer_minutes,
-                                  seconds=settings.task_remind_timer_seconds),
-            'args': (),  # Пустые аргументы, так как dispatch_chunks не принимает параметров
+        **remind_schedule,
+        # Журнал удалений нужен только для синхронизации изменений
+        'purge-deletions': {
+            'task': 'src.async_tasks.tasks.purge_deletions',
+            'schedule': timedelta(days=1),
+            'args': (),
         },
     }
 )
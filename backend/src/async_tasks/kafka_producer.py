@@ -1,29 +1,25 @@
 import asyncio
-import json
-
-from aiokafka import AIOKafkaProducer
 
 from src.shared.config import settings
+from src.shared.kafka_producer import send_message, stop_kafka_producer
 from src.shared.logger_setup import setup_logger
 
 logger = setup_logger(__name__)
 
 async def send_to_kafka(message):
-    """Асинхронная отправка в Kafka с улучшенной обработкой ошибок"""
-    producer = AIOKafkaProducer(
-        bootstrap_servers=settings.kafka_broker,
-        value_serializer=lambda v: json.dumps(v).encode('utf-8')
-    )
+    """Асинхронная отправка в Kafka через общий продюсер процесса"""
     try:
-        await producer.start()
-        await producer.send('task_remind', message)
-        await producer.flush()  # Гарантируем отправку
+        # Напоминания одного пользователя попадают в одну партицию
+        await send_message(settings.kafka_task_remind_topic_name, message, key=str(message.get("user", "")))
         logger.info("Successfully sent to Kafka: %s", message)
     except Exception as e:
         logger.error("Kafka send error: %s", str(e))
         raise
-    finally:
-        await producer.stop()
+
+
+async def main():
+    await send_to_kafka({"task_remind": 1})
+    await stop_kafka_producer()
 
 if __name__ == "__main__":
-    asyncio.run(send_to_kafka({"task_remind": 1}))
\ No newline at end of file
+    asyncio.run(main())
@@ -1,14 +1,47 @@
+from celery import chord
+from celery.signals import worker_process_shutdown, worker_shutdown
+
 from .celery_app import app  # Относительный импорт
 
-from .worker_logic import process_users_chunk
+from .async_worker_logic import run_users_chunk_async, shutdown_async_worker
+from .worker_logic import process_users_chunk, get_user_chunks, get_remind_window, commit_remind_window, \
+    process_due_schedule, fill_due_schedule, purge_task_deletions
 from ..shared.config import settings
 
+# Продюсер Kafka и event loop живут все время работы процесса воркера
+worker_shutdown.connect(shutdown_async_worker)
+worker_process_shutdown.connect(shutdown_async_worker)
+
 
 @app.task(bind=True, name='src.async_tasks.tasks.process_chunk')
-def process_chunk(self, chunk_index):
-    return process_users_chunk(chunk_index)
+def process_chunk(self, first_user_id, last_user_id, window_start=None, window_end=None):
+    if settings.task_remind_worker_mode == "async":
+        return run_users_chunk_async(first_user_id, last_user_id, window_start, window_end)
+    return process_users_chunk(first_user_id, last_user_id, window_start, window_end)
 
 @app.task(name='src.async_tasks.tasks.dispatch_chunks')
 def dispatch_chunks():
-    for i in range(settings.task_remind_timer_workers):
-        process_chunk.delay(i)
\ No newline at end of file
+    window_start, window_end = get_remind_window()
+    chunks = [process_chunk.s(first_user_id, last_user_id, window_start, window_end)
+              for first_user_id, last_user_id in get_user_chunks()]
+    if not chunks:
+        commit_remind_window(window_start, window_end)
+        return
+    # Граница сдвигается только после успешной обработки всех чанков
+    chord(chunks)(commit_window.si(window_start, window_end))
+
+@app.task(name='src.async_tasks.tasks.commit_window')
+def commit_window(window_start, window_end):
+    return commit_remind_window(window_start, window_end)
+
+@app.task(name='src.async_tasks.tasks.poll_due_tasks')
+def poll_due_tasks():
+    return process_due_schedule()
+
+@app.task(name='src.async_tasks.tasks.schedule_existing_tasks')
+def schedule_existing_tasks():
+    return fill_due_schedule()
+
+@app.task(name='src.async_tasks.tasks.purge_deletions')
+def purge_deletions():
+    return purge_task_deletions()
@@ -1,11 +1,14 @@
 import asyncio
 import datetime
-from functools import partial
+import math
+from itertools import groupby
 
+import redis
 from sqlalchemy import create_engine, or_
 from sqlalchemy.orm import sessionmaker
 
 from src.async_tasks.kafka_producer import send_to_kafka
+from src.shared.kafka_producer import flush_kafka_producer, stop_kafka_producer
 from src.shared.config import settings
 from src.shared.logger_setup import setup_logger
 from src.shared.schemas import TaskDTO
@@ -15,81 +18,349 @@ logger = setup_logger(__name__)
 
 # Создаем синхронную сессию
 # TODO: Добавить нормальный путь на синхронный движок ну или так оставить
-engine = create_engine(settings.postgres_db.replace("+asyncpg","+psycopg2"), echo=True)
+engine = create_engine(settings.postgres_db.replace("+asyncpg","+psycopg2"), echo=settings.db_echo)
 SyncSessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
-from src.shared.models import User, Task, TaskStatus
+redis_client = redis.Redis(
+    host=settings.redis_host,
+    port=settings.redis_port,
+    password=settings.redis_password,
+    db=settings.redis_db,
+    decode_responses=True,
+)
+# Граница уже обработанных сроков задач и время последнего полного повтора напоминаний
+REMIND_HIGH_WATER_MARK_KEY = "task_remind:high_water_mark"
+REMIND_LAST_FULL_RUN_KEY = "task_remind:last_full_run"
+# Журнал отправленных напоминаний: ключ на (task_id, version) живет task_remind_dedup_seconds
+REMIND_LEDGER_KEY = "task_remind:ledger:{task_id}:{version}"
+REMIND_STATS_KEY = "task_remind:stats"
+# Атомарно забирает из расписания задачи, срок которых уже наступил
+pop_due_tasks_script = redis_client.register_script("""
+local items = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, ARGV[2])
+for i = 1, #items, 2 do
+    redis.call('ZREM', KEYS[1], items[i])
+end
+return items
+""")
 
-from sqlalchemy import select, func, and_
+from src.shared.models import User, Task, TaskStatus, TaskDeletion
 
+from sqlalchemy import select, func, and_, delete
 
-def sync_send_to_kafka(message):
-    """Синхронная обертка для асинхронной отправки в Kafka"""
+
+# Один event loop на процесс воркера, в нем живет общий продюсер Kafka
+_worker_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """Event loop процесса воркера, создается при первом использовании"""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+    return _worker_loop
+
+
+def shutdown_worker_loop(**kwargs):
+    """Останавливает продюсер и закрывает event loop воркера"""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        return
     try:
-        # Создаем новый event loop
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        # Создаем частично примененную функцию для запуска
-        send_func = partial(
-            send_to_kafka,
-            message=message
-        )
+        _worker_loop.run_until_complete(stop_kafka_producer())
+    except Exception as e:
+        logger.error("Failed to stop Kafka producer: %s", str(e))
+    finally:
+        _worker_loop.close()
+        _worker_loop = None
+
 
-        # Запускаем корутину
-        loop.run_until_complete(send_func())
+def sync_send_to_kafka(message) -> bool:
+    """Синхронная обертка для асинхронной отправки в Kafka"""
+    try:
+        get_worker_loop().run_until_complete(send_to_kafka(message))
         logger.info("Successfully sent to Kafka for user %s", message.get("user"))
+        return True
     except Exception as e:
         logger.error("Failed to send to Kafka: %s", str(e))
-    finally:
-        # Всегда закрываем loop
-        loop.close()
-        asyncio.set_event_loop(None)
+        return False
 
-def process_users_chunk(chunk_index):
-    """Синхронная обработка чанка"""
+
+def sync_flush_kafka():
+    """Дожидается доставки сообщений, отправленных без ожидания"""
+    try:
+        get_worker_loop().run_until_complete(flush_kafka_producer())
+    except Exception as e:
+        logger.error("Failed to flush Kafka producer: %s", str(e))
+
+
+def get_remind_window() -> tuple[str | None, str]:
+    """
+    Get window of due dates for this run. Persisted high-water mark is moved by commit_remind_window
+    only after all chunks of the run succeed, so window of failed run is processed again.
+    Every task_remind_repeat_minutes the window covers all overdue tasks to remind them again
+    :return: (window_start, window_end) in ISO format, window_start None - all overdue tasks
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    high_water_mark = redis_client.get(REMIND_HIGH_WATER_MARK_KEY)
+    last_full_run = redis_client.get(REMIND_LAST_FULL_RUN_KEY)
+    repeat_interval = datetime.timedelta(minutes=settings.task_remind_repeat_minutes)
+
+    window_start = high_water_mark
+    if not high_water_mark or (settings.task_remind_repeat_minutes and (
+            not last_full_run or now - datetime.datetime.fromisoformat(last_full_run) >= repeat_interval)):
+        window_start = None
+    logger.info("Remind window: %s - %s", window_start or "all overdue", now.isoformat())
+    return window_start, now.isoformat()
+
+
+def commit_remind_window(window_start: str | None, window_end: str):
+    """
+    Move high-water mark to the end of processed window
+    :param window_start: Start of processed window, None - it was full run
+    :param window_end: End of processed window
+    """
+    high_water_mark = redis_client.get(REMIND_HIGH_WATER_MARK_KEY)
+    # Запуски могут завершиться не по порядку, граница не должна сдвигаться назад
+    if not high_water_mark or datetime.datetime.fromisoformat(high_water_mark) < \
+            datetime.datetime.fromisoformat(window_end):
+        redis_client.set(REMIND_HIGH_WATER_MARK_KEY, window_end)
+    if window_start is None:
+        redis_client.set(REMIND_LAST_FULL_RUN_KEY, window_end)
+    logger.info("Remind window up to %s is processed", window_end)
+
+
+def get_user_chunks() -> list[tuple[int, int]]:
+    """
+    Split users into chunks of nearly equal size by id ranges.
+    Number of chunks grows with users count, but is not less than number of workers
+    :return: list of (first_user_id, last_user_id) inclusive bounds
+    """
+    with SyncSessionLocal() as session:
+        total_users = session.scalar(select(func.count()).select_from(User))
+        logger.info("Total users: %s", total_users)
+        if not total_users:
+            return []
+        chunk_count = max(settings.task_remind_timer_workers,
+                          math.ceil(total_users / settings.task_remind_users_per_chunk))
+        chunk_count = min(chunk_count, settings.task_remind_max_chunks, total_users)
+        buckets = select(User.id, func.ntile(chunk_count).over(order_by=User.id).label("bucket")).subquery()
+        chunks = session.execute(
+            select(func.min(buckets.c.id), func.max(buckets.c.id))
+            .group_by(buckets.c.bucket)
+            .order_by(buckets.c.bucket)
+        ).all()
+        logger.info("Users split into %s chunks", len(chunks))
+        return [(first_user_id, last_user_id) for first_user_id, last_user_id in chunks]
+
+
+def get_ledger_keys(batch: list[tuple[int, list[dict]]]) -> dict[int, str]:
+    """
+    Ledger keys of batch tasks
+    :param batch: list of (user_id, tasks)
+    :return: dict of task_id -> ledger key
+    """
+    return {task["id"]: REMIND_LEDGER_KEY.format(task_id=task["id"], version=task["version"])
+            for _, tasks in batch for task in tasks}
+
+
+def build_reminders(batch: list[tuple[int, list[dict]]], ledger_keys: dict[int, str],
+                    reminded: set[str]) -> tuple[list[dict], int]:
+    """
+    Build reminder messages without tasks already reminded within dedup window
+    :param batch: list of (user_id, tasks)
+    :param ledger_keys: dict of task_id -> ledger key
+    :param reminded: Ledger keys which exist
+    :return: (messages, number of suppressed reminders)
+    """
+    messages, suppressed = [], 0
+    for user_id, tasks in batch:
+        fresh_tasks = [task for task in tasks if ledger_keys[task["id"]] not in reminded]
+        suppressed += len(tasks) - len(fresh_tasks)
+        if fresh_tasks:
+            messages.append({
+                "event": "task_due",
+                "user": user_id,
+                "tasks": fresh_tasks
+            })
+    return messages, suppressed
+
+
+def record_reminders(pipe, sent_messages: list[dict], ledger_keys: dict[int, str], suppressed: int,
+                     stats: dict[str, int]):
+    """
+    Queue ledger entries of sent reminders and counters
+    :param pipe: Redis pipeline
+    :param sent_messages: Successfully sent messages
+    :param ledger_keys: dict of task_id -> ledger key
+    :param suppressed: Number of suppressed reminders
+    :param stats: Counters of sent and suppressed reminders
+    """
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    sent = 0
+    for message in sent_messages:
+        sent += len(message["tasks"])
+        if settings.task_remind_dedup_seconds:
+            for task in message["tasks"]:
+                pipe.set(ledger_keys[task["id"]], now, ex=settings.task_remind_dedup_seconds)
+    pipe.hincrby(REMIND_STATS_KEY, "sent", sent)
+    pipe.hincrby(REMIND_STATS_KEY, "suppressed", suppressed)
+    stats["sent"] += sent
+    stats["suppressed"] += suppressed
+
+
+def send_reminders(batch: list[tuple[int, list[dict]]], stats: dict[str, int]) -> list[dict]:
+    """
+    Send reminders for batch of users, skipping tasks already reminded within dedup window
+    :param batch: list of (user_id, tasks)
+    :param stats: Counters of sent and suppressed reminders
+    :return: list[dict]: Messages which were not sent
+    """
+    ledger_keys = get_ledger_keys(batch)
+    reminded = set()
+    if settings.task_remind_dedup_seconds:
+        keys = list(ledger_keys.values())
+        reminded = {key for key, reminded_at in zip(keys, redis_client.mget(keys)) if reminded_at}
+
+    messages, suppressed = build_reminders(batch, ledger_keys, reminded)
+    sent_messages, unsent_messages = [], []
+    for message in messages:
+        (sent_messages if sync_send_to_kafka(message) else unsent_messages).append(message)
+    pipe = redis_client.pipeline(transaction=False)
+    record_reminders(pipe, sent_messages, ledger_keys, suppressed, stats)
+    pipe.execute()
+    return unsent_messages
+
+
+def due_tasks_statement(first_user_id, last_user_id, window_start=None, window_end=None):
+    """
+    Query of in progress tasks of users chunk with due date in (window_start, window_end]
+    or changed after window_start and already due, without window_start - all overdue tasks.
+    Tasks are ordered by user
+    """
+    window_end = datetime.datetime.fromisoformat(window_end) if window_end \
+        else datetime.datetime.now(datetime.timezone.utc)
+    if window_start:
+        window_start = datetime.datetime.fromisoformat(window_start)
+        # Задачи, созданные или перенесенные на уже прошедший срок, тоже попадают в окно
+        due_condition = and_(or_(Task.fulfilled_date > window_start, Task.updated_at > window_start),
+                             Task.fulfilled_date <= window_end)
+    else:
+        due_condition = or_(Task.fulfilled_date <= window_end, Task.fulfilled_date == None)
+    return select(Task).where(
+        and_(
+            Task.user_id.between(first_user_id, last_user_id),
+            Task.status == TaskStatus.IN_PROGRESS,
+            due_condition
+        )
+    ).order_by(Task.user_id, Task.id).execution_options(yield_per=settings.task_remind_yield_per)
+
+
+def process_users_chunk(first_user_id, last_user_id, window_start=None, window_end=None):
+    """
+    Синхронная обработка чанка пользователей с id из [first_user_id, last_user_id].
+    Напоминает о задачах со сроком в (window_start, window_end], без window_start - обо всех просроченных
+    """
     with SyncSessionLocal() as session:
         try:
-            # Получаем общее количество пользователей
-            total_users = session.scalar(select(func.count()).select_from(User))
-            logger.info("Total users: %s", total_users)
-            if not total_users:
-                logger.info("No users found.")
-                return
-
-            # Расчет смещения и лимита
-            user_per_chunk = max(1, total_users // 4)  # Жестко 4 чанка
-            offset = chunk_index * user_per_chunk
-            logger.info("Processing chunk %s with offset %s", chunk_index, offset)
-            # Получаем пользователей чанка
-            users = session.scalars(
-                select(User).offset(offset).limit(user_per_chunk)
-            ).all()
-            logger.info("Users: %s", users)
-            for user in users:
-                # Обработка задач пользователя
-                tasks = session.scalars(
-                    select(Task).where(
-                        and_(
-                            Task.user_id == user.id,
-                            Task.status == TaskStatus.IN_PROGRESS,
-                            or_
-                            (Task.fulfilled_date < datetime.datetime.now(),
-                             Task.fulfilled_date == None)
-                        )
-                    )
-                ).all()
-                logger.info("Tasks for user %s: %s", user.id, tasks)
-                if tasks:
-                    message = {
-                        "event": "task_due",
-                        "user": user.id,
-                        "tasks": [TaskDTO(**task.to_dict()).model_dump() for task in tasks]
-                    }
-                    sync_send_to_kafka(message)
-                    logger.info("Sent tasks to Kafka for user %s", user.id)
-            return f"Processed chunk {chunk_index} with {len(users)} users"
+            logger.info("Processing chunk of users %s..%s", first_user_id, last_user_id)
+            # Один потоковый запрос на весь чанк, задачи приходят сгруппированными по пользователю
+            tasks = session.scalars(due_tasks_statement(first_user_id, last_user_id, window_start, window_end))
+            stats = {"sent": 0, "suppressed": 0}
+            unsent = 0
+            batch, batch_size = [], 0
+            for user_id, user_tasks in groupby(tasks, key=lambda task: task.user_id):
+                batch.append((user_id, [TaskDTO(**task.to_dict()).model_dump(mode="json") for task in user_tasks]))
+                batch_size += len(batch[-1][1])
+                if batch_size >= settings.task_remind_yield_per:
+                    unsent += len(send_reminders(batch, stats))
+                    batch, batch_size = [], 0
+            if batch:
+                unsent += len(send_reminders(batch, stats))
+            sync_flush_kafka()
+            logger.info("Chunk %s..%s reminders: %s", first_user_id, last_user_id, stats)
+            # Ошибка чанка не дает chord сдвинуть границу, неотправленные напоминания попадут в следующий запуск
+            if unsent:
+                raise RuntimeError(f"{unsent} reminders were not sent")
+            return f"Processed chunk {first_user_id}..{last_user_id}, reminders {stats}"
 
         except Exception as e:
-            logger.error(f"Error in chunk {chunk_index}: {str(e)}")
-            raise
\ No newline at end of file
+            logger.error(f"Error in chunk {first_user_id}..{last_user_id}: {str(e)}")
+            raise
+
+
+def process_due_schedule():
+    """
+    Remind about tasks from schedule which became due since last poll.
+    Tasks which were not reminded because of errors are returned to schedule
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    stats = {"sent": 0, "suppressed": 0}
+    # Возвращаем после цикла, иначе они сразу снова попадут в выборку
+    failed = {}
+    try:
+        while True:
+            items = pop_due_tasks_script(keys=[settings.task_remind_schedule_key],
+                                         args=[now.timestamp(), settings.task_remind_yield_per])
+            if not items:
+                break
+            scores = {int(task_id): float(score) for task_id, score in zip(items[::2], items[1::2])}
+            try:
+                with SyncSessionLocal() as session:
+                    # Задача могла быть выполнена или перенесена после попадания в расписание
+                    tasks = session.scalars(
+                        select(Task).where(
+                            and_(
+                                Task.id.in_(list(scores)),
+                                Task.status == TaskStatus.IN_PROGRESS,
+                                Task.fulfilled_date <= now
+                            )
+                        ).order_by(Task.user_id, Task.id)
+                    ).all()
+                    batch = [(user_id, [TaskDTO(**task.to_dict()).model_dump(mode="json") for task in user_tasks])
+                             for user_id, user_tasks in groupby(tasks, key=lambda task: task.user_id)]
+                unsent = send_reminders(batch, stats) if batch else []
+            except Exception:
+                failed.update(scores)
+                raise
+            failed.update({task["id"]: scores[task["id"]] for message in unsent for task in message["tasks"]})
+    finally:
+        if failed:
+            # NX: не затираем срок, который задача получила после извлечения из расписания
+            redis_client.zadd(settings.task_remind_schedule_key, failed, nx=True)
+            logger.warning("Returned %s not reminded tasks to schedule", len(failed))
+    sync_flush_kafka()
+    if stats["sent"] or stats["suppressed"]:
+        logger.info("Scheduled reminders: %s", stats)
+    return f"Processed scheduled reminders {stats}"
+
+
+def fill_due_schedule():
+    """
+    Register in schedule all in progress tasks with due date, used when switching to schedule mode
+    """
+    scheduled = 0
+    with SyncSessionLocal() as session:
+        tasks = session.execute(
+            select(Task.id, Task.fulfilled_date).where(
+                and_(Task.status == TaskStatus.IN_PROGRESS, Task.fulfilled_date != None)
+            ).execution_options(yield_per=settings.task_remind_yield_per)
+        )
+        for partition in tasks.partitions():
+            redis_client.zadd(settings.task_remind_schedule_key,
+                              {task_id: fulfilled_date.timestamp() for task_id, fulfilled_date in partition})
+            scheduled += len(partition)
+    logger.info("Scheduled %s tasks", scheduled)
+    return f"Scheduled {scheduled} tasks"
+
+
+def purge_task_deletions():
+    """
+    Remove deletion log records older than changes sync retention
+    """
+    border = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+        days=settings.task_deletion_retention_days)
+    with SyncSessionLocal() as session:
+        purged = session.execute(delete(TaskDeletion).where(TaskDeletion.deleted_at < border)).rowcount
+        session.commit()
+    logger.info("Purged %s task deletions", purged)
+    return f"Purged {purged} task deletions"
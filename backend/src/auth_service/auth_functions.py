@@ -13,6 +13,9 @@ from src.shared.schemas import SessionDTO, AccessTokenUpdate, SessionSchema
 
 logger = setup_logger(__name__)
 
+# Версия набора claims: 1 - только sub (email), 2 - добавлен uid (id пользователя)
+TOKEN_CLAIMS_VERSION = 2
+
 
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     """
@@ -56,14 +59,17 @@ def create_refresh_token(data: dict, expires_delta: timedelta = None) -> str:
     return encoded_jwt
 
 
-def create_new_token(email: str, is_refresh: bool = False):
+def create_new_token(email: str, is_refresh: bool = False, user_id: int | None = None):
     """
     Create new access or refresh token
     :param email: User email for sub header
     :param is_refresh: True if refresh token needs to be created
+    :param user_id: User id for uid claim
     :return: str: JWT token
     """
     data = {"iss": "auth-service", "sub": email, "jti": str(uuid.uuid4())}
+    if user_id is not None:
+        data.update({"uid": user_id, "ver": TOKEN_CLAIMS_VERSION})
     return create_refresh_token(data=data) if is_refresh else create_access_token(data=data)
 
 
@@ -122,7 +128,7 @@ async def verify_and_refresh_access_token(token: str) -> str | None:
             else:
                 # Create new access token without refsrh token and update session
                 logger.info("Creating new access token")
-                new_access_token = create_new_token(payload['sub'])
+                new_access_token = create_new_token(payload['sub'], user_id=session.user_id)
                 if not new_access_token:
                     logger.error("Failed to create new access token")
                     return None
@@ -169,7 +175,7 @@ async def refresh_access_token(refresh_token: str):
         session = SessionDTO(**response.json())
 
         # Create new access token
-        new_access_token = create_new_token(email)
+        new_access_token = create_new_token(email, user_id=session.user_id)
         if not new_access_token:
             logger.error("Failed to create new access token")
             return None
@@ -182,7 +188,7 @@ async def refresh_access_token(refresh_token: str):
         if about_to_expire or exp_time <= datetime.now():
             logger.warning("Refresh token is about to expire" if about_to_expire else f"Refresh token expired at: {exp_time}")
             # Create new refresh token
-            new_refresh_token = create_new_token(email, is_refresh=True)
+            new_refresh_token = create_new_token(email, is_refresh=True, user_id=session.user_id)
             if not new_refresh_token:
                 logger.error("Failed to create new refresh token")
                 return None
@@ -1,12 +1,33 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from src.auth_service.router import auth_router
+from src.shared.http_client import get_http_client, close_http_client
+from src.shared.kafka_producer import get_kafka_producer, stop_kafka_producer
 from src.shared.logger_setup import setup_logger
 
 logger = setup_logger(__name__)
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Управление жизненным циклом приложения"""
+    get_http_client()
+    logger.info("Started shared http client")
+    try:
+        await get_kafka_producer()
+    except Exception as e:
+        # Продюсер будет запущен при первой отправке
+        logger.error(f"Kafka producer start failed: {e}")
+
+    yield  # FastAPI работает здесь
+
+    await stop_kafka_producer()
+    await close_http_client()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(auth_router)
 
 
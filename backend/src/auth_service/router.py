@@ -47,7 +47,7 @@ async def register_user(user_data: UserCreate):
     logger.info(f"User {user.username} registered")
 
     # 2. Создание сессии
-    register_token = auth_functions.create_new_token(user.email)
+    register_token = auth_functions.create_new_token(user.email, user_id=user.id)
     response = await create_session(
         SessionSchema(
             user_id=user.id,
@@ -141,7 +141,7 @@ async def login_user(auth_form: AuthForm):
         sessions = [SessionDTO(**session) for session in sessions_data]
         if not sessions:
             logger.warning(f"User {user.username} has no sessions")
-            new_register_token = auth_functions.create_new_token(user.email)
+            new_register_token = auth_functions.create_new_token(user.email, user_id=user.id)
             response = await create_session(
                 SessionSchema(
                     user_id=user.id,
@@ -159,10 +159,10 @@ async def login_user(auth_form: AuthForm):
     logger.info(f"User {user} logged in")
 
     # Create access tokens
-    access_token = auth_functions.create_new_token(user.email)
+    access_token = auth_functions.create_new_token(user.email, user_id=user.id)
     logger.info(f"User {user.username} logged in with access token {access_token}")
     # Create refresh token if remember_me is set
-    refresh_token = auth_functions.create_new_token(user.email, is_refresh=True) if auth_form.remember_me else None
+    refresh_token = auth_functions.create_new_token(user.email, is_refresh=True, user_id=user.id) if auth_form.remember_me else None
     response = await create_session(
         SessionSchema(
             user_id=user.id,
@@ -194,7 +194,7 @@ async def get_forgot_password(email: str):
     user = UserDTO(**response.json())
     logger.info(f"User {user.username} is found by email {email}")
 
-    recovery_token = auth_functions.create_new_token(email)
+    recovery_token = auth_functions.create_new_token(email, user_id=user.id)
     logger.info(f"User {user.username}'s recovery token {recovery_token}")
 
     # Create recovery session
@@ -1,45 +1,130 @@
+import asyncio
+
 import redis.asyncio as aioredis
 
+from src.session_service.crud import SESSION_OWNERS_KEY
 from src.shared.config import settings
 from src.shared.logger_setup import setup_logger
 
 logger = setup_logger(__name__)
 
+# Счетчики обработки событий истечения сессий
+expiration_stats = {"processed": 0, "lagged": 0, "dropped": 0}
 
 
-async def listen_expirations():
-    redis_client = aioredis.Redis(
-        host=settings.redis_host,
-        port=settings.redis_port,
-        password=settings.redis_password,
-        db=settings.redis_db,
-        decode_responses=True,
-    )
-
+async def read_expirations(redis_client: aioredis.Redis, queue: asyncio.Queue):
+    """
+    Read expired session keys and put them to queue
+    :param redis_client: Redis client
+    :param queue: Queue of (session_id, received_at)
+    """
     # Включаем события истечения ключей
     await redis_client.config_set("notify-keyspace-events", "Ex")
 
     pubsub = redis_client.pubsub()
-    await pubsub.psubscribe("__keyevent@0__:expired")
+    await pubsub.psubscribe(f"__keyevent@{settings.redis_db or 0}__:expired")
 
     logger.info("Subscribed to key expiration events")
 
-    async for message in pubsub.listen():
-        try:
+    loop = asyncio.get_running_loop()
+    try:
+        async for message in pubsub.listen():
             if message["type"] != "pmessage":
                 continue
 
             session_key = message["data"]
-            logger.info(f"Expired key detected: {session_key}")
-
             if not session_key.startswith("session:"):
                 continue
+            try:
+                queue.put_nowait((session_key.split(":")[1], loop.time()))
+            except asyncio.QueueFull:
+                expiration_stats["dropped"] += 1
+                logger.warning(f"Expiration queue is full, dropped {session_key}")
+    finally:
+        await pubsub.close()
 
-            # Удаление сессии из всех множеств user:{user_id}:sessions
-            async for key in redis_client.scan_iter(match="user:*:sessions"):
-                removed = await redis_client.srem(key, session_key.split(":")[1])
-                if removed:
-                    logger.info(f"Removed expired session {session_key} from {key}")
 
+async def keep_reading_expirations(redis_client: aioredis.Redis, queue: asyncio.Queue):
+    """
+    Restart reader of expired session keys after errors, otherwise handler waits for queue forever
+    :param redis_client: Redis client
+    :param queue: Queue of (session_id, received_at)
+    """
+    while True:
+        try:
+            await read_expirations(redis_client, queue)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logger.error("Error handling expiration: %s", e, exc_info=True)
+            logger.error("Expiration reader failed: %s", e, exc_info=True)
+        await asyncio.sleep(settings.session_expiration_retry_seconds)
+
+
+async def collect_batch(queue: asyncio.Queue) -> list[tuple[str, float]]:
+    """
+    Wait for first expired session and collect batch during batch wait time
+    :param queue: Queue of (session_id, received_at)
+    :return: list of (session_id, received_at)
+    """
+    batch = [await queue.get()]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.session_expiration_batch_wait_ms / 1000
+    while len(batch) < settings.session_expiration_batch_size:
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+
+async def handle_expirations(redis_client: aioredis.Redis, batch: list[tuple[str, float]]):
+    """
+    Remove expired sessions from their user:{user_id}:sessions sets
+    :param redis_client: Redis client
+    :param batch: list of (session_id, received_at)
+    """
+    now = asyncio.get_running_loop().time()
+    expiration_stats["lagged"] += sum(1 for _, received_at in batch
+                                      if now - received_at > settings.session_expiration_lag_seconds)
+
+    session_ids = [session_id for session_id, _ in batch]
+    user_ids = await redis_client.hmget(SESSION_OWNERS_KEY, session_ids)
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for session_id, user_id in zip(session_ids, user_ids):
+            if user_id is None:
+                # Сессия создана до появления session_owners - ее уберет get_sessions
+                logger.info(f"Owner of expired session {session_id} is unknown")
+                continue
+            pipe.srem(f"user:{user_id}:sessions", session_id)
+        pipe.hdel(SESSION_OWNERS_KEY, *session_ids)
+        await pipe.execute()
+
+    expiration_stats["processed"] += len(batch)
+    logger.info(f"Removed {len(batch)} expired sessions, stats: {expiration_stats}")
+
+
+async def listen_expirations():
+    redis_client = aioredis.Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        password=settings.redis_password,
+        db=settings.redis_db,
+        decode_responses=True,
+    )
+    queue = asyncio.Queue(maxsize=settings.session_expiration_queue_size)
+    reader = asyncio.create_task(keep_reading_expirations(redis_client, queue))
+
+    try:
+        while True:
+            batch = await collect_batch(queue)
+            try:
+                await handle_expirations(redis_client, batch)
+            except Exception as e:
+                logger.error("Error handling expiration: %s", e, exc_info=True)
+    finally:
+        reader.cancel()
+        await redis_client.close()
@@ -1,14 +1,61 @@
 # CRUD сессией
+import asyncio
 import uuid
 from datetime import datetime, timedelta
 
 from src.session_service.redis_base import redis_client
 from src.shared.config import settings
+from src.shared.local_auth import token_digest
 from src.shared.logger_setup import setup_logger
 from src.shared.schemas import SessionDTO
 
 logger = setup_logger(__name__)
 
+TOKEN_TYPES = ("access_token", "refresh_token")
+# session_id -> user_id, нужен чтобы после истечения сессии найти множество ее пользователя
+SESSION_OWNERS_KEY = "session_owners"
+
+
+def token_index_key(token: str, token_type: str = "access_token") -> str:
+    """
+    Build key of the token -> session_id index
+    :param token: session token
+    :param token_type: access_token or refresh_token
+    :return: str: index key like token:access:<sha256>
+    """
+    return f"token:{token_type.removesuffix('_token')}:{token_digest(token)}"
+
+
+def _index_session_tokens(pipe, session_data: dict, ttl: int | None = None):
+    """
+    Queue index keys for all tokens of session
+    :param pipe: Redis pipeline
+    :param session_data: session hash
+    :param ttl: index lifetime in seconds, None - without expiration
+    """
+    for token_type in TOKEN_TYPES:
+        token = session_data.get(token_type)
+        if token:
+            pipe.set(token_index_key(token, token_type), session_data["session_id"], ex=ttl)
+
+
+def _delete_sessions(pipe, sessions_data: list[dict]):
+    """
+    Queue deletion of sessions with their set members, owners and token index keys.
+    Services caching sessions are notified about deleted access tokens
+    :param pipe: Redis pipeline
+    :param sessions_data: session hashes
+    """
+    for session_data in sessions_data:
+        session_id = session_data["session_id"]
+        index_keys = [token_index_key(session_data[token_type], token_type)
+                      for token_type in TOKEN_TYPES if session_data.get(token_type)]
+        pipe.delete(f"session:{session_id}", *index_keys)
+        pipe.srem(f"user:{session_data['user_id']}:sessions", session_id)
+        pipe.publish(settings.session_invalidation_channel, token_digest(session_data["access_token"]))
+    if sessions_data:
+        pipe.hdel(SESSION_OWNERS_KEY, *[session_data["session_id"] for session_data in sessions_data])
+
 
 async def create_and_store_session(user_id: int, access_token: str, refresh_token: str = None, device: str = "unknown",
                                    ip_address: str = "unknown") -> SessionDTO:
@@ -34,9 +81,15 @@ async def create_and_store_session(user_id: int, access_token: str, refresh_toke
     logger.info(f"Storing session with expires_at: {expires_at}")
 
     logger.warning(session_data)
-    await redis_client.hset(f"session:{session_id}", mapping=session_data)
-    await redis_client.expire(f"session:{session_id}", int((expires_at - created_at).total_seconds()))
-    await redis_client.sadd(f"user:{user_id}:sessions", session_id)
+    ttl = int((expires_at - created_at).total_seconds())
+    # Сессия, ее TTL, владелец и индекс токенов записываются одной транзакцией
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(f"session:{session_id}", mapping=session_data)
+        pipe.expire(f"session:{session_id}", ttl)
+        pipe.sadd(f"user:{user_id}:sessions", session_id)
+        pipe.hset(SESSION_OWNERS_KEY, session_id, user_id)
+        _index_session_tokens(pipe, session_data, ttl)
+        await pipe.execute()
     return SessionDTO(**session_data)
 
 
@@ -47,16 +100,31 @@ async def get_sessions(user_id: int):
     :return: list of user sessions
     """
     sessions = []
-    async for key in redis_client.scan_iter(f"session:*"):
-        session_data = await redis_client.hgetall(key)
-        if session_data.get("user_id") == str(user_id):
-            # Проверяем наличие всех необходимых полей
-            required_fields = ["session_id", "user_id", "access_token", "device", "ip_address", "created_at",
-                               "expires_at"]
-            if all(field in session_data for field in required_fields):
-                session_data["created_at"] = datetime.fromisoformat(session_data["created_at"])
-                session_data["expires_at"] = datetime.fromisoformat(session_data["expires_at"])
-                sessions.append(session_data)
+    session_ids = list(await redis_client.smembers(f"user:{user_id}:sessions"))
+    if not session_ids:
+        return sessions
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for session_id in session_ids:
+            pipe.hgetall(f"session:{session_id}")
+        sessions_data = await pipe.execute()
+
+    stale_ids = []
+    required_fields = ["session_id", "user_id", "access_token", "device", "ip_address", "created_at", "expires_at"]
+    for session_id, session_data in zip(session_ids, sessions_data):
+        if not session_data:
+            stale_ids.append(session_id)
+            continue
+        # Проверяем наличие всех необходимых полей
+        if all(field in session_data for field in required_fields):
+            session_data["created_at"] = datetime.fromisoformat(session_data["created_at"])
+            session_data["expires_at"] = datetime.fromisoformat(session_data["expires_at"])
+            sessions.append(session_data)
+    if stale_ids:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.srem(f"user:{user_id}:sessions", *stale_ids)
+            pipe.hdel(SESSION_OWNERS_KEY, *stale_ids)
+            await pipe.execute()
+        logger.info(f"Removed stale sessions {stale_ids} of user {user_id}")
     return sessions
 
 
@@ -66,13 +134,19 @@ async def delete_inactive_sessions(user_id: int) -> list[str]:
     :param user_id: User ID
     :return: list[str]: list of deleted sessions
     """
-    result = []
-    session_ids = await redis_client.smembers(f"user:{user_id}:sessions")
-    for session_id in session_ids:
-        session_data = await redis_client.hgetall(f"session:{session_id}")
-        if not session_data:
-            await redis_client.srem(f"user:{user_id}:sessions", session_id)
-            result.append(session_id)
+    session_ids = list(await redis_client.smembers(f"user:{user_id}:sessions"))
+    if not session_ids:
+        return []
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for session_id in session_ids:
+            pipe.exists(f"session:{session_id}")
+        exists = await pipe.execute()
+    result = [session_id for session_id, is_exists in zip(session_ids, exists) if not is_exists]
+    if result:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.srem(f"user:{user_id}:sessions", *result)
+            pipe.hdel(SESSION_OWNERS_KEY, *result)
+            await pipe.execute()
     return result
 
 
@@ -84,8 +158,9 @@ async def delete_session_by_id(session_id: str) -> SessionDTO | None:
     """
     session_data = await redis_client.hgetall(f"session:{session_id}")
     if session_data:
-        await redis_client.delete(f"session:{session_id}")
-        await redis_client.srem(f"user:{session_data['user_id']}:sessions", session_id)
+        async with redis_client.pipeline(transaction=True) as pipe:
+            _delete_sessions(pipe, [session_data])
+            await pipe.execute()
         # Проверяем наличие всех необходимых полей
         required_fields = ["session_id", "user_id", "access_token", "device", "ip_address", "created_at", "expires_at"]
         if all(field in session_data for field in required_fields):
@@ -102,11 +177,17 @@ async def get_session_by_token(token: str, token_type: str = "access_token") ->
     :param token_type: access_token or refresh_token
     :return: dict|None
     """
-    async for key in redis_client.scan_iter("session:*"):
-        session_data = await redis_client.hgetall(key)
-        if session_data.get(token_type) == token:
-            return SessionDTO(**session_data)
-    return None
+    index_key = token_index_key(token, token_type)
+    session_id = await redis_client.get(index_key)
+    if not session_id:
+        return None
+    session_data = await redis_client.hgetall(f"session:{session_id}")
+    if session_data.get(token_type) != token:
+        # Сессия истекла или токен был заменен - индекс устарел
+        logger.info(f"Dropped stale token index {index_key}")
+        await redis_client.delete(index_key)
+        return None
+    return SessionDTO(**session_data)
 
 
 async def delete_session_by_access_token(token: str, token_type: str = "access_token") -> SessionDTO | None:
@@ -116,12 +197,12 @@ async def delete_session_by_access_token(token: str, token_type: str = "access_t
     :param token_type: token type
     :return:
     """
-    async for key in redis_client.scan_iter("session:*"):
-        session_data = await redis_client.hgetall(key)
-        if session_data.get(token_type) == token:
-            await redis_client.delete(f"session:{session_data['session_id']}")
-            await redis_client.srem(f"user:{session_data['user_id']}:sessions", session_data["session_id"])
-            return SessionDTO(**session_data)
+    session = await get_session_by_token(token, token_type)
+    if session:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            _delete_sessions(pipe, [session.model_dump()])
+            await pipe.execute()
+        return session
     return None
 
 
@@ -135,9 +216,15 @@ async def update_session_access_token(old_token: str, new_token: str, session_ob
     """
     session = session_obj if session_obj else await get_session_by_token(old_token)
     if session:
-        await redis_client.hset(f"session:{session.session_id}", "access_token", new_token)
-        session = await get_session_by_token(new_token)
-        return session
+        new_index_key = token_index_key(new_token)
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(f"session:{session.session_id}", "access_token", new_token)
+            pipe.delete(token_index_key(old_token))
+            pipe.publish(settings.session_invalidation_channel, token_digest(old_token))
+            pipe.set(new_index_key, session.session_id)
+            pipe.expireat(new_index_key, int(session.expires_at.timestamp()))
+            await pipe.execute()
+        return session.model_copy(update={"access_token": new_token})
     return None
 
 async def delete_sessions_by_user_id(user_id: int) -> list[SessionDTO]:
@@ -146,12 +233,41 @@ async def delete_sessions_by_user_id(user_id: int) -> list[SessionDTO]:
     :param user_id: user ID
     :return: List of deleted sessions
     """
-    result = []
-    session_ids = await redis_client.smembers(f"user:{user_id}:sessions")
-    for session_id in session_ids:
-        session_data = await redis_client.hgetall(f"session:{session_id}")
-        if session_data:
-            await redis_client.delete(f"session:{session_id}", session_id)
-            await redis_client.srem(f"user:{user_id}:sessions", session_id)
-            result.append(session_id)
-    return result
\ No newline at end of file
+    session_ids = list(await redis_client.smembers(f"user:{user_id}:sessions"))
+    if not session_ids:
+        return []
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for session_id in session_ids:
+            pipe.hgetall(f"session:{session_id}")
+        sessions_data = [session_data for session_data in await pipe.execute() if session_data]
+    async with redis_client.pipeline(transaction=True) as pipe:
+        _delete_sessions(pipe, sessions_data)
+        # Удаляем и идентификаторы уже истекших сессий
+        pipe.srem(f"user:{user_id}:sessions", *session_ids)
+        pipe.hdel(SESSION_OWNERS_KEY, *session_ids)
+        await pipe.execute()
+    return [session_data["session_id"] for session_data in sessions_data]
+
+
+async def rebuild_token_index() -> int:
+    """
+    Build token index and session owners for sessions created before they were introduced
+    :return: int: number of indexed sessions
+    """
+    indexed = 0
+    async for key in redis_client.scan_iter("session:*"):
+        session_data = await redis_client.hgetall(key)
+        if not session_data.get("session_id"):
+            continue
+        ttl = await redis_client.ttl(key)
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(SESSION_OWNERS_KEY, session_data["session_id"], session_data["user_id"])
+            _index_session_tokens(pipe, session_data, ttl if ttl > 0 else None)
+            await pipe.execute()
+        indexed += 1
+    logger.info(f"Indexed tokens of {indexed} sessions")
+    return indexed
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_token_index())
\ No newline at end of file
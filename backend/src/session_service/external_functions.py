@@ -2,6 +2,7 @@ import httpx
 from httpx import Response
 
 from src.session_service.endpoints import CHECK_AUTH, FIND_USER_BY_EMAIL
+from src.shared.http_client import get_http_client
 from src.shared.logger_setup import setup_logger
 from src.shared.schemas import TokenModelResponse
 
@@ -21,11 +22,11 @@ async def check_auth_from_external_service(access_token: str, skip_auth: bool =
             "X-Skip-Auth": str(skip_auth)
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(CHECK_AUTH, headers=headers)
-            response.raise_for_status()  # Проверяем статусный код на ошибки
-            json_data = response.json()
-            return json_data
+        client = get_http_client()
+        response = await client.get(CHECK_AUTH, headers=headers)
+        response.raise_for_status()  # Проверяем статусный код на ошибки
+        json_data = response.json()
+        return json_data
     except httpx.RequestError as e:
         logger.error(f"An error occurred while requesting {e.request.url!r}.")
     except httpx.HTTPStatusError as e:
@@ -44,10 +45,10 @@ async def find_user_by_email(email: str) -> Response:
     headers = {
         "content-type": "application/json",
     }
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{FIND_USER_BY_EMAIL}?email={email}",
-            headers=headers,
-        )
-        logger.info(f"Find user by email: {email} with response {response.json()}")
-        return response
+    client = get_http_client()
+    response = await client.get(
+        f"{FIND_USER_BY_EMAIL}?email={email}",
+        headers=headers,
+    )
+    logger.info(f"Find user by email: {email} with response {response.json()}")
+    return response
@@ -6,6 +6,8 @@ from fastapi import FastAPI
 from src.session_service.as_tasks import listen_expirations
 from src.session_service.redis_base import redis_client
 from src.session_service.router import session_router
+from src.shared.http_client import get_http_client, close_http_client
+from src.shared.local_auth import listen_session_invalidations
 from src.shared.logger_setup import setup_logger
 
 logger = setup_logger(__name__)
@@ -14,9 +16,11 @@ logger = setup_logger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Управление жизненным циклом приложения"""
+    get_http_client()
     # Запускаем фоновую задачу
     task = asyncio.create_task(listen_expirations())
     logger.info("Started session expiration listener")
+    invalidations_task = asyncio.create_task(listen_session_invalidations())
 
     yield  # FastAPI работает здесь
 
@@ -26,7 +30,13 @@ async def lifespan(app: FastAPI):
         await task
     except asyncio.CancelledError:
         logger.info("Stopped session expiration listener")
+    invalidations_task.cancel()
+    try:
+        await invalidations_task
+    except asyncio.CancelledError:
+        logger.info("Stopped session invalidations listener")
     await redis_client.close()
+    await close_http_client()
 
 
 app = FastAPI(title="Session Service",lifespan=lifespan)
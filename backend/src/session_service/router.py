@@ -10,6 +10,7 @@ from src.session_service.crud import create_and_store_session, delete_inactive_s
 from src.session_service.external_functions import check_auth_from_external_service, find_user_by_email
 from src.shared import logger_setup
 from src.shared.common_functions import decode_token, verify_response
+from src.shared.local_auth import verify_token_locally
 from src.shared.schemas import SessionDTO, AccessTokenUpdate, AuthResponse, UserDTO
 from src.shared.schemas import SessionSchema
 
@@ -29,6 +30,9 @@ async def get_valid_token(request: Request, credentials: HTTPAuthorizationCreden
     if request.headers.get("X-Skip-Auth") == "True":
         logger.info("Skip authentication check")
         return credentials.credentials
+    token = await verify_token_locally(credentials.credentials, crud.get_session_by_token)
+    if token:
+        return token
     verify_result = await check_auth_from_external_service(credentials.credentials)
     logger.info(f"Verify result {verify_result}")
     if not verify_result or not verify_result["token"]:
@@ -24,6 +24,16 @@ def decode_token(token: str, is_refresh: bool = False) -> dict[str, any] | None:
         return None
 
 
+def get_token_user_id(payload: dict[str, any]) -> int | None:
+    """
+    Get user id from token payload
+    :param payload: Decoded token payload
+    :return: int | None: User id or None for tokens issued before uid claim
+    """
+    user_id = payload.get("uid")
+    return int(user_id) if user_id is not None else None
+
+
 def verify_response(response: Response, waited_status_code: int = 200) -> dict[str, int | str] | None:
     """
     Verify response code
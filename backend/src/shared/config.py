@@ -14,6 +14,7 @@ class Settings(BaseSettings):
     postgres_user: str = ""
     postgres_password: str = ""
     postgres_db: str = ""
+    db_echo: bool = False
     redis_host: str = ""
     redis_port: int = 6379
     redis_password: str = ""
@@ -27,20 +28,60 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int = 0
     access_token_expire_hours: int = 0
     about_to_expire_seconds: int = 300
+    local_auth_enabled: bool = True
+    session_cache_max_size: int = 10000
+    session_cache_ttl_seconds: float = 5.0
+    session_invalidation_channel: str = "session_invalidations"
+    session_invalidation_retry_seconds: float = 1.0
     refresh_token_expire_days: int = 0
     session_cleanup_seconds: int = 3600
     session_cleanup_minutes: int = 0
     session_cleanup_hours: int = 0
     session_cleanup_days: int = 0
+    session_expiration_batch_size: int = 500
+    session_expiration_batch_wait_ms: int = 200
+    session_expiration_queue_size: int = 10000
+    session_expiration_lag_seconds: float = 5.0
+    session_expiration_retry_seconds: float = 1.0
     user_service_url: str = Field("http://127.0.0.1:8002")
     session_service_url: str = Field("http://127.0.0.1:8001")
     auth_service_url: str = Field("http://127.0.0.1:8000")
     task_service_url: str = Field("http://127.0.1:8003")
+    password_executor: str = "thread"
+    password_executor_workers: int = 4
+    password_max_concurrency: int = 8
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_seconds: float = 30.0
+    http_timeout_seconds: float = 10.0
+    http_connect_timeout_seconds: float = 5.0
+    http2_enabled: bool = False
+    task_page_max_limit: int = 1000
+    task_changes_overlap_seconds: int = 5
+    task_deletion_retention_days: int = 30
+    task_bulk_max_items: int = 1000
+    task_list_cache_enabled: bool = True
+    task_list_cache_ttl_seconds: int = 300
+    task_export_chunk_size: int = 1000
+    task_search_config: str = "simple"
     kafka_broker: str = Field("localhost:9093")
+    kafka_producer_linger_ms: int = 5
+    kafka_producer_max_batch_size: int = 16384
+    kafka_producer_compression_type: str = ""
+    kafka_producer_acks: str = "1"
+    kafka_producer_fire_and_forget: bool = False
     kafka_email_send_topic_name: str = "email_send"
     kafka_email_send_topic_partitions: int = 2
     kafka_task_remind_topic_name: str = "task_remind"
     kafka_task_remind_topic_partitions: int = 2
+    kafka_consumer_max_records: int = 500
+    kafka_consumer_timeout_ms: int = 100
+    task_remind_emit_concurrency: int = 50
+    socketio_manager: str = "memory"
+    socket_connect_rate: float = 200.0
+    socket_connect_burst: int = 500
+    socketio_redis_url: str = ""
+    socketio_channel: str = "socketio"
     email_host: str = "smtp.gmail.com"
     email_port: int = 587
     email_send_retries: int = 3
@@ -53,6 +94,15 @@ class Settings(BaseSettings):
     task_remind_timer_minutes: int = 5
     task_remind_timer_hours: int = 0
     task_remind_timer_workers: int = 1
+    task_remind_mode: str = "scan"
+    task_remind_worker_mode: str = "sync"
+    task_remind_poll_seconds: int = 5
+    task_remind_schedule_key: str = "task_remind:schedule"
+    task_remind_yield_per: int = 1000
+    task_remind_users_per_chunk: int = 10000
+    task_remind_max_chunks: int = 64
+    task_remind_repeat_minutes: int = 60
+    task_remind_dedup_seconds: int = 600
 
 
 settings = Settings()
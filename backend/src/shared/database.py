@@ -7,7 +7,7 @@ from sqlalchemy.orm import declarative_base
 from src.shared.config import settings
 
 # Создаем движок
-engine = create_async_engine(settings.postgres_db, echo=True)
+engine = create_async_engine(settings.postgres_db, echo=settings.db_echo)
 
 # Фабрика асинхронных сессий
 SessionLocal = async_sessionmaker(
@@ -0,0 +1,46 @@
+import httpx
+
+from src.shared.config import settings
+from src.shared.logger_setup import setup_logger
+
+logger = setup_logger(__name__)
+
+# Общий клиент сервиса, соединения переиспользуются для каждого целевого хоста
+_client: httpx.AsyncClient | None = None
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create pooled http client for inter-service calls
+    :return: httpx.AsyncClient
+    """
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry_seconds,
+    )
+    timeout = httpx.Timeout(settings.http_timeout_seconds, connect=settings.http_connect_timeout_seconds)
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=settings.http2_enabled)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get shared http client, create it if lifespan has not started it yet
+    :return: httpx.AsyncClient
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+        logger.info("Shared http client created")
+    return _client
+
+
+async def close_http_client():
+    """
+    Close shared http client and its connections
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Shared http client closed")
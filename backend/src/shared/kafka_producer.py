@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+from aiokafka import AIOKafkaProducer
+
+from src.shared.config import settings
+from src.shared.logger_setup import setup_logger
+
+logger = setup_logger(__name__)
+
+# Один продюсер на процесс, переиспользуется для всех сообщений
+_producer: AIOKafkaProducer | None = None
+_producer_lock = asyncio.Lock()
+
+
+def create_kafka_producer() -> AIOKafkaProducer:
+    """
+    Create producer with batching and compression settings
+    :return: AIOKafkaProducer
+    """
+    acks = settings.kafka_producer_acks
+    return AIOKafkaProducer(
+        bootstrap_servers=settings.kafka_broker,
+        value_serializer=lambda m: json.dumps(m).encode("utf-8"),
+        linger_ms=settings.kafka_producer_linger_ms,
+        max_batch_size=settings.kafka_producer_max_batch_size,
+        compression_type=settings.kafka_producer_compression_type or None,
+        acks=acks if acks == "all" else int(acks),
+    )
+
+
+async def get_kafka_producer() -> AIOKafkaProducer:
+    """
+    Get started shared producer, start it on first use
+    :return: AIOKafkaProducer
+    """
+    global _producer
+    async with _producer_lock:
+        if _producer is None:
+            producer = create_kafka_producer()
+            await producer.start()
+            _producer = producer
+            logger.info("Kafka producer started")
+    return _producer
+
+
+async def flush_kafka_producer():
+    """
+    Wait until all pending messages of shared producer are delivered
+    """
+    if _producer is not None:
+        await _producer.flush()
+
+
+async def stop_kafka_producer():
+    """
+    Flush pending messages and stop shared producer
+    """
+    global _producer
+    async with _producer_lock:
+        if _producer is not None:
+            try:
+                await _producer.stop()
+            finally:
+                _producer = None
+                logger.info("Kafka producer stopped")
+
+
+def _log_delivery(topic: str, message: dict, future: asyncio.Future):
+    if future.cancelled():
+        logger.warning(f"Kafka delivery to {topic} cancelled: {message}")
+    elif future.exception():
+        logger.error(f"Kafka delivery to {topic} failed: {future.exception()}")
+    else:
+        record = future.result()
+        logger.info(f"Delivered to {topic} partition {record.partition} offset {record.offset}")
+
+
+async def send_message(topic: str, message: dict, fire_and_forget: bool = None, key: str = None):
+    """
+    Send message with shared producer
+    :param topic: Kafka topic
+    :param message: Message to send
+    :param fire_and_forget: Do not wait for delivery, result is logged by callback.
+    kafka_producer_fire_and_forget setting by default
+    :param key: Message key, messages with same key go to same partition
+    """
+    if fire_and_forget is None:
+        fire_and_forget = settings.kafka_producer_fire_and_forget
+    producer = await get_kafka_producer()
+    delivery = await producer.send(topic, message, key=key.encode("utf-8") if key else None)
+    if fire_and_forget:
+        delivery.add_done_callback(lambda future: _log_delivery(topic, message, future))
+        return
+    await delivery
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable
+
+import redis.asyncio as aioredis
+
+from src.shared.common_functions import decode_token
+from src.shared.config import settings
+from src.shared.http_client import get_http_client
+from src.shared.logger_setup import setup_logger
+from src.shared.schemas import SessionDTO
+
+logger = setup_logger(__name__)
+
+GET_SESSION_BY_TOKEN = f"{settings.session_service_url}/session/crud/search"
+
+
+def token_digest(token: str) -> str:
+    """
+    Digest of token used as cache key and in invalidation messages
+    :param token: JWT token
+    :return: str: sha256 hex digest
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class SessionCache:
+    """
+    Bounded cache of sessions by access token with short lifetime
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._items: OrderedDict[str, tuple[float, SessionDTO]] = OrderedDict()
+
+    def get(self, token: str) -> SessionDTO | None:
+        key = token_digest(token)
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, session = item
+        if expires_at < time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return session
+
+    def put(self, token: str, session: SessionDTO):
+        key = token_digest(token)
+        self._items[key] = (time.monotonic() + self.ttl_seconds, session)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def invalidate(self, digest: str):
+        self._items.pop(digest, None)
+
+    def clear(self):
+        self._items.clear()
+
+
+session_cache = SessionCache(settings.session_cache_max_size, settings.session_cache_ttl_seconds)
+
+
+async def get_session_from_external_service(token: str) -> SessionDTO | None:
+    """
+    Get session by access token from session service
+    :param token: Access token
+    :return: SessionDTO | None
+    """
+    response = await get_http_client().get(GET_SESSION_BY_TOKEN, params={"token": token,
+                                                                          "token_type": "access_token"})
+    if response.status_code != 200:
+        logger.info(f"Session for token was not found: {response.status_code}")
+        return None
+    return SessionDTO(**response.json())
+
+
+async def get_cached_session(token: str,
+                             find_session: Callable[[str], Awaitable[SessionDTO | None]] = None) -> SessionDTO | None:
+    """
+    Get session by access token through session cache
+    :param token: Access token
+    :param find_session: Session lookup on cache miss, session service request by default
+    :return: SessionDTO | None
+    """
+    session = session_cache.get(token)
+    if session:
+        return session
+    session = await (find_session or get_session_from_external_service)(token)
+    if session:
+        session_cache.put(token, session)
+    return session
+
+
+async def verify_token_locally(token: str,
+                               find_session: Callable[[str], Awaitable[SessionDTO | None]] = None) -> str | None:
+    """
+    Verify access token signature, expiration and session without auth service
+    :param token: Access token
+    :param find_session: Session lookup on cache miss, session service request by default
+    :return: str | None: Token if it is valid, None if token must be checked by auth service
+    """
+    if not settings.local_auth_enabled:
+        return None
+    payload = decode_token(token)
+    if not payload or not payload.get("sub") or not payload.get("exp"):
+        return None
+    # Токены, которые пора обновлять, проверяет auth_service
+    time_left = (datetime.fromtimestamp(payload["exp"]) - datetime.now()).total_seconds()
+    if time_left < settings.about_to_expire_seconds:
+        return None
+    try:
+        session = await get_cached_session(token, find_session)
+    except Exception as e:
+        logger.error(f"Local session check failed: {str(e)}")
+        return None
+    return token if session else None
+
+
+async def read_session_invalidations(redis_client: aioredis.Redis):
+    """
+    Subscribe to session invalidations and drop invalidated sessions from local cache
+    :param redis_client: Redis client
+    """
+    pubsub = redis_client.pubsub()
+    try:
+        await pubsub.subscribe(settings.session_invalidation_channel)
+        # Пока не было подписки, сообщения могли быть пропущены
+        session_cache.clear()
+        logger.info("Subscribed to session invalidations")
+        async for message in pubsub.listen():
+            if message["type"] == "message":
+                session_cache.invalidate(message["data"])
+    finally:
+        await pubsub.close()
+
+
+async def listen_session_invalidations():
+    """
+    Drop sessions deleted in session service from local cache, resubscribe after errors
+    """
+    redis_client = aioredis.Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        password=settings.redis_password,
+        db=settings.redis_db,
+        decode_responses=True,
+    )
+    try:
+        while True:
+            try:
+                await read_session_invalidations(redis_client)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Session invalidations listener failed: %s", e, exc_info=True)
+            await asyncio.sleep(settings.session_invalidation_retry_seconds)
+    finally:
+        await redis_client.close()
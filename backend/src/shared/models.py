@@ -3,9 +3,11 @@ from enum import Enum
 from typing import List
 
 import sqlalchemy
-from sqlalchemy import String, Boolean, DateTime, func, ForeignKey, Integer
+from sqlalchemy import String, Boolean, DateTime, func, ForeignKey, Integer, Index, text, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, declarative_base, relationship
 
+from src.shared.config import settings
 from src.shared.database import engine
 
 Base = declarative_base()
@@ -59,8 +61,23 @@ class Task(Base):
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # Поддерживается базой при каждой записи, нужен только для поиска
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{settings.task_search_config}', "
+                 f"coalesce(title, '') || ' ' || coalesce(description, ''))", persisted=True),
+        deferred=True,
+    )
     user: Mapped["User"] = relationship("User", back_populates="tasks", lazy='select')
 
+    __table_args__ = (
+        Index("ix_tasks_user_id_status", "user_id", "status", "id"),
+        Index("ix_tasks_user_id_updated_at", "user_id", "updated_at", "id"),
+        # Только невыполненные задачи - по ним идет поиск напоминаний
+        Index("ix_tasks_due", "user_id", "fulfilled_date", postgresql_where=text("status = 'IN_PROGRESS'")),
+        Index("ix_tasks_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
     def to_dict(self) -> dict:
         return {
             "id": self.id,
@@ -74,6 +91,20 @@ class Task(Base):
             "version": self.version
         }
 
+class TaskDeletion(Base):
+    # Журнал удалений для синхронизации изменений на клиентах
+    __tablename__ = "task_deletions"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    task_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Без внешнего ключа: журнал не должен мешать удалению пользователя, записи чистит purge_task_deletions
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    deleted_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_task_deletions_user_id_deleted_at", "user_id", "deleted_at"),
+    )
+
 
 async def drop_all_tables():
     async with engine.begin() as conn:
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional, Any
 
-from pydantic import BaseModel, Field, EmailStr, AliasChoices
+from pydantic import BaseModel, Field, EmailStr, AliasChoices, field_validator
 from pydantic.alias_generators import to_camel
 
 from src.shared.models import TaskStatus
@@ -73,6 +73,13 @@ class TaskDTO(BaseModel):
     user_id: int = Field(validation_alias=AliasChoices('user_id', 'userId'))
     fulfilled_date: Optional[datetime] | None = Field(None,validation_alias=AliasChoices('fulfilled_date', 'fulfilledDate'))
     version: int = Field(0)
+
+    @field_validator("status", mode="before")
+    @classmethod
+    def status_value(cls, value):
+        # Позволяет строить DTO напрямую из модели Task
+        return value.value if isinstance(value, TaskStatus) else value
+
     class Config:
         from_attributes = True
         json_encoders = {
@@ -1,13 +1,59 @@
 # CRUD сессией
-from sqlalchemy import select
+import base64
+import json
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, tuple_, func, insert, update, delete, values, column, cast, case, Integer, Boolean
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
+from src.shared.config import settings
+from src.shared.database import SessionLocal
 from src.shared.logger_setup import setup_logger
-from src.shared.models import Task
-from src.task_service.schemas import TaskCreate
+from src.shared.models import Task, TaskStatus, TaskDeletion
+from src.task_service.redis_base import redis_client
+from src.task_service.task_cache import bump_task_list_generation
+from src.task_service.schemas import TaskCreate, TaskSort, TaskUpdateItem
 
 logger = setup_logger(__name__)
 
+# Поля, которые можно менять массовым обновлением
+BULK_UPDATE_FIELDS = ["title", "description", "status", "fulfilled_date"]
+
+# Колонки задачи без поискового вектора
+TASK_COLUMNS = [column for column in Task.__table__.c if column.name != "search_vector"]
+
+
+async def schedule_task_reminder(task: Task, deleted: bool = False):
+    """
+    Register task due date in reminder schedule, remove it if task can not be reminded
+    :param task: Task
+    :param deleted: True if task was deleted
+    """
+    if settings.task_remind_mode != "schedule":
+        return
+    if deleted or task.status != TaskStatus.IN_PROGRESS or not task.fulfilled_date:
+        await redis_client.zrem(settings.task_remind_schedule_key, task.id)
+    else:
+        await redis_client.zadd(settings.task_remind_schedule_key, {task.id: task.fulfilled_date.timestamp()})
+
+async def schedule_task_reminders(tasks: list[Task], deleted: bool = False):
+    """
+    Register due dates of many tasks in reminder schedule in one round trip
+    :param tasks: Tasks
+    :param deleted: True if tasks were deleted
+    """
+    if settings.task_remind_mode != "schedule" or not tasks:
+        return
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for task in tasks:
+            if deleted or task.status != TaskStatus.IN_PROGRESS or not task.fulfilled_date:
+                pipe.zrem(settings.task_remind_schedule_key, task.id)
+            else:
+                pipe.zadd(settings.task_remind_schedule_key, {task.id: task.fulfilled_date.timestamp()})
+        await pipe.execute()
+
 async def create_task(task_create: TaskCreate, user_id:int,  db:AsyncSession):
     async with db.begin():
         task = Task(
@@ -20,48 +66,441 @@ async def create_task(task_create: TaskCreate, user_id:int,  db:AsyncSession):
         db.add(task)
         logger.info(f"Created task {task.to_dict()}")
     await db.refresh(task)
+    await bump_task_list_generation(user_id)
+    await schedule_task_reminder(task)
     return task
 
-async def get_tasks_by_user_id(db:AsyncSession, user_id:int):
+def encode_cursor(task: Task, sort: TaskSort) -> str:
+    """
+    Encode position after task for keyset pagination
+    :param task: Last task of page
+    :param sort: Sort field
+    :return: str: Opaque cursor
+    """
+    value = task.updated_at.isoformat() if sort == TaskSort.UPDATED_AT else task.id
+    return base64.urlsafe_b64encode(json.dumps([sort.value, value, task.id]).encode()).decode()
+
+
+def decode_cursor(cursor: str, sort: TaskSort) -> tuple | None:
+    """
+    Decode cursor of keyset pagination
+    :param cursor: Opaque cursor
+    :param sort: Sort field
+    :return: tuple | None: (sort value, id) or None if cursor is invalid or was made for another sort
+    """
+    try:
+        cursor_sort, value, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if cursor_sort != sort.value:
+            return None
+        if sort == TaskSort.UPDATED_AT:
+            value = datetime.fromisoformat(value)
+        elif not isinstance(value, int):
+            return None
+        return value, int(task_id)
+    except (ValueError, TypeError):
+        return None
+
+
+async def get_tasks_page(db: AsyncSession, user_id: int, limit: int | None = None, cursor: tuple | None = None,
+                         status: TaskStatus | None = None, fulfilled_from: datetime | None = None,
+                         fulfilled_to: datetime | None = None, sort: TaskSort = TaskSort.ID,
+                         descending: bool = False) -> tuple[list[Task], str | None]:
+    """
+    Get page of user tasks with keyset pagination
+    :param db: session
+    :param user_id: User id
+    :param limit: Page size, None - all tasks
+    :param cursor: Decoded cursor (sort value, id) of previous page
+    :param status: Status filter
+    :param fulfilled_from: Minimal fulfilled date
+    :param fulfilled_to: Maximal fulfilled date
+    :param sort: Sort field
+    :param descending: Sort direction
+    :return: (tasks, cursor of next page or None)
+    """
+    sort_column = Task.updated_at if sort == TaskSort.UPDATED_AT else Task.id
+    query = select(Task).filter(Task.user_id == user_id)
+    if status is not None:
+        query = query.filter(Task.status == status)
+    if fulfilled_from:
+        query = query.filter(Task.fulfilled_date >= fulfilled_from)
+    if fulfilled_to:
+        query = query.filter(Task.fulfilled_date <= fulfilled_to)
+    if cursor:
+        position = tuple_(sort_column, Task.id)
+        query = query.filter(position < tuple_(*cursor) if descending else position > tuple_(*cursor))
+    if descending:
+        query = query.order_by(sort_column.desc(), Task.id.desc())
+    else:
+        query = query.order_by(sort_column, Task.id)
+    if limit:
+        # Лишняя строка показывает, есть ли следующая страница
+        query = query.limit(limit + 1)
+
+    async with db.begin():
+        tasks = (await db.execute(query)).scalars().all()
+    next_cursor = None
+    if limit and len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = encode_cursor(tasks[-1], sort)
+    logger.info(f"Get {len(tasks)} tasks of user {user_id}")
+    return tasks, next_cursor
+
+def encode_changes_cursor(moment: datetime) -> str:
+    """
+    Encode moment of changes sync
+    :param moment: Database time of sync
+    :return: str: Opaque cursor
+    """
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode()
+
+
+def decode_changes_cursor(cursor: str) -> datetime | None:
+    """
+    Decode cursor of changes sync
+    :param cursor: Opaque cursor
+    :return: datetime | None: Moment of previous sync or None if cursor is invalid
+    """
+    try:
+        return datetime.fromisoformat(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, TypeError):
+        return None
+
+
+async def get_task_changes(db: AsyncSession, user_id: int,
+                           since: datetime | None) -> tuple[list[Task], list[int], str, bool]:
+    """
+    Get tasks created or updated and ids of tasks deleted since previous sync
+    :param db: session
+    :param user_id: User id
+    :param since: Moment of previous sync, None - full sync
+    :return: (tasks, deleted task ids, new cursor, True if client must replace its list)
+    """
     async with db.begin():
-        tasks = await db.execute(select(Task).filter(Task.user_id == user_id).order_by(Task.id))
-        tasks = tasks.scalars().all()
-        logger.info(f"Get tasks {tasks}")
-    return tasks
+        now = (await db.execute(select(func.now()))).scalar_one()
+        reset = since is None or since < now - timedelta(days=settings.task_deletion_retention_days)
+        query = select(Task).filter(Task.user_id == user_id).order_by(Task.updated_at, Task.id)
+        deleted = []
+        if not reset:
+            # updated_at - время начала транзакции, поэтому перекрываем окно,
+            # чтобы не потерять изменения транзакций, закоммиченных после прошлого запроса
+            bound = since - timedelta(seconds=settings.task_changes_overlap_seconds)
+            query = query.filter(Task.updated_at > bound)
+            deleted = (await db.execute(
+                select(TaskDeletion.task_id).filter(TaskDeletion.user_id == user_id, TaskDeletion.deleted_at > bound)
+            )).scalars().all()
+        tasks = (await db.execute(query)).scalars().all()
+    logger.info(f"Get {len(tasks)} changed and {len(deleted)} deleted tasks of user {user_id}, reset: {reset}")
+    return tasks, list(deleted), encode_changes_cursor(now), reset
 
-async def delete_task_by_id(db:AsyncSession, task_id:int):
+async def delete_task_by_id(db:AsyncSession, task_id:int, user_id:int):
+    statement = (
+        delete(Task)
+        .where(Task.id == task_id, Task.user_id == user_id)
+        .returning(Task)
+        .execution_options(synchronize_session=False)
+    )
     async with db.begin():
-        task = await db.execute(select(Task).filter(Task.id == task_id))
-        task = task.scalar_one_or_none()
+        task = (await db.scalars(statement)).one_or_none()
         if not task:
-            logger.warning(f"Task {task_id} not found.")
+            logger.warning(f"Task {task_id} of user {user_id} not found.")
             return None
         logger.info(f"Deleted task {task.to_dict()}")
-        await db.delete(task)
+        db.add(TaskDeletion(task_id=task.id, user_id=task.user_id))
+    await bump_task_list_generation(user_id)
+    await schedule_task_reminder(task, deleted=True)
     return task
 
-async def update_task_by_id(db:AsyncSession, task_id:int, task_create:TaskCreate):
+async def update_task_by_id(db:AsyncSession, task_id:int, user_id:int, task_create:TaskCreate):
+    """
+    Update task with one conditional UPDATE, the row is changed only if it belongs to user
+    and its version equals to version from request
+    :param db: session
+    :param task_id: Task id
+    :param user_id: User id
+    :param task_create: Task data to update
+    :return: (updated task or None, version of task before update or None if task not found)
+    """
+    update_data = task_create.model_dump(exclude_unset=True, exclude={"version"})
+    logger.info(f"Updating task {task_id} with {update_data}")
+    conditions = [Task.id == task_id, Task.user_id == user_id]
+    if task_create.version is not None:
+        conditions.append(Task.version == task_create.version)
+    updated = (
+        update(Task)
+        .where(*conditions)
+        .values(**update_data, version=Task.version + 1)
+        .returning(*TASK_COLUMNS)
+        .cte("updated")
+    )
+    updated_task = aliased(Task, updated)
+    # Внешний запрос видит строку до обновления, поэтому при конфликте получаем текущую версию
+    statement = (
+        select(Task.version, updated_task)
+        .outerjoin(updated_task, updated_task.id == Task.id)
+        .where(Task.id == task_id, Task.user_id == user_id)
+    )
     async with db.begin():
-        task = await db.execute(select(Task).filter(Task.id == task_id))
-        task = task.scalar_one_or_none()
-        if not task:
-            logger.warning(f"Task {task_id} not found.")
-            return None
-        logger.info(f"Found old task {task.to_dict()}")
-        update_data = task_create.model_dump(exclude_unset=True)
-        logger.info(f"Updating task {update_data}")
-        for key, value in update_data.items():
-            setattr(task, key, value)
-        task.version = task.version + 1
-    await db.refresh(task)
-    return task
+        row = (await db.execute(statement)).one_or_none()
+    if not row:
+        logger.warning(f"Task {task_id} of user {user_id} not found.")
+        return None, None
+    current_version, task = row
+    if not task:
+        logger.warning(f"Task {task_id} version conflict, current version {current_version}")
+        return None, current_version
+    await bump_task_list_generation(user_id)
+    await schedule_task_reminder(task)
+    return task, current_version
+
+def build_search_query(text: str) -> str | None:
+    """
+    Build tsquery with prefix matching of every word, special characters are dropped
+    :param text: Search text from user
+    :return: str | None: tsquery or None if text has no words
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def decode_search_cursor(cursor: str) -> tuple | None:
+    """
+    Decode cursor of search pagination
+    :param cursor: Opaque cursor
+    :return: tuple | None: (rank, id) or None if cursor is invalid
+    """
+    try:
+        rank, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(task_id)
+    except (ValueError, TypeError):
+        return None
+
+
+async def search_tasks(db: AsyncSession, user_id: int, text: str, limit: int, cursor: tuple | None = None,
+                       status: TaskStatus | None = None, fulfilled_from: datetime | None = None,
+                       fulfilled_to: datetime | None = None) -> tuple[list[Task], str | None]:
+    """
+    Ranked full-text search in title and description of user tasks
+    :param db: session
+    :param user_id: User id
+    :param text: Search text
+    :param limit: Page size
+    :param cursor: Decoded cursor (rank, id) of previous page
+    :param status: Status filter
+    :param fulfilled_from: Minimal fulfilled date
+    :param fulfilled_to: Maximal fulfilled date
+    :return: (tasks, cursor of next page or None)
+    """
+    search_query = build_search_query(text)
+    if not search_query:
+        return [], None
+    ts_query = func.to_tsquery(settings.task_search_config, search_query)
+    rank = func.ts_rank_cd(Task.search_vector, ts_query).label("rank")
+    query = select(Task, rank).filter(Task.user_id == user_id, Task.search_vector.op("@@")(ts_query))
+    if status is not None:
+        query = query.filter(Task.status == status)
+    if fulfilled_from:
+        query = query.filter(Task.fulfilled_date >= fulfilled_from)
+    if fulfilled_to:
+        query = query.filter(Task.fulfilled_date <= fulfilled_to)
+    if cursor:
+        query = query.filter(tuple_(rank, Task.id) < tuple_(*cursor))
+    # Лишняя строка показывает, есть ли следующая страница
+    query = query.order_by(rank.desc(), Task.id.desc()).limit(limit + 1)
 
-async def get_task_by_id(db:AsyncSession, task_id:int):
     async with db.begin():
-        task = await db.execute(select(Task).filter(Task.id == task_id))
-        task = task.scalar_one_or_none()
-        if not task:
-            logger.error(f"Task {task_id} not found.")
-            return None
-        logger.info(f"Found task {task.to_dict()}")
-        return task
\ No newline at end of file
+        rows = (await db.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_task, last_rank = rows[-1]
+        next_cursor = base64.urlsafe_b64encode(json.dumps([last_rank, last_task.id]).encode()).decode()
+    logger.info(f"Found {len(rows)} tasks of user {user_id} by '{text}'")
+    return [task for task, _ in rows], next_cursor
+
+async def stream_tasks(user_id: int | None = None):
+    """
+    Read tasks through server-side cursor by chunks without loading all rows
+    :param user_id: User id, None - tasks of all users
+    :return: AsyncIterator of row chunks
+    """
+    # Собственная сессия: ответ отдается после закрытия сессии зависимости get_db
+    query = select(*TASK_COLUMNS).order_by(Task.id).execution_options(yield_per=settings.task_export_chunk_size)
+    if user_id is not None:
+        query = query.filter(Task.user_id == user_id)
+    async with SessionLocal() as db:
+        async with db.begin():
+            result = await db.stream(query)
+            async for rows in result.partitions():
+                yield rows
+
+def find_duplicates(ids: list[int]) -> set[int]:
+    """
+    Get positions of repeated ids, repeated items are not processed
+    :param ids: Task ids from request
+    :return: set[int]: Positions of repeats
+    """
+    seen = set()
+    duplicates = set()
+    for index, task_id in enumerate(ids):
+        if task_id in seen:
+            duplicates.add(index)
+        seen.add(task_id)
+    return duplicates
+
+
+async def bulk_create_tasks(db: AsyncSession, user_id: int, tasks_create: list[TaskCreate]) -> list[dict]:
+    """
+    Create many tasks with one multi-row INSERT
+    :param db: session
+    :param user_id: User id
+    :param tasks_create: New tasks
+    :return: list[dict]: Result for each item
+    """
+    rows = [{
+        "user_id": user_id,
+        "title": task_create.title,
+        "description": task_create.description,
+        "status": task_create.status,
+        "fulfilled_date": task_create.fulfilled_date,
+    } for task_create in tasks_create]
+    async with db.begin():
+        tasks = (await db.scalars(insert(Task).returning(Task, sort_by_parameter_order=True), rows)).all()
+    logger.info(f"Created {len(tasks)} tasks of user {user_id}")
+    await bump_task_list_generation(user_id)
+    await schedule_task_reminders(tasks)
+    return [{"index": index, "id": task.id, "result": "created", "task": task}
+            for index, task in enumerate(tasks)]
+
+
+async def bulk_update_tasks(db: AsyncSession, user_id: int, items: list[TaskUpdateItem]) -> list[dict]:
+    """
+    Update many tasks with one UPDATE ... FROM VALUES, each item is applied only if its version is current.
+    Like single PATCH only fields sent by client are changed
+    :param db: session
+    :param user_id: User id
+    :param items: Tasks with id and version
+    :return: list[dict]: Result for each item
+    """
+    duplicates = find_duplicates([item.id for item in items])
+    # Как и в одиночном PATCH, меняются только переданные поля: для каждого поля передается флаг
+    changes = values(
+        column("id", Integer),
+        column("version", Integer),
+        *[column(f"set_{field}", Boolean) for field in BULK_UPDATE_FIELDS],
+        *[column(field, Task.__table__.c[field].type) for field in BULK_UPDATE_FIELDS],
+        name="changes",
+    ).data([
+        (item.id, item.version,
+         *[field in item.model_fields_set for field in BULK_UPDATE_FIELDS],
+         *[getattr(item, field) for field in BULK_UPDATE_FIELDS])
+        for index, item in enumerate(items) if index not in duplicates
+    ])
+    statement = (
+        update(Task)
+        .where(Task.id == changes.c.id, Task.user_id == user_id, Task.version == changes.c.version)
+        .values(
+            **{field: case((changes.c[f"set_{field}"], cast(changes.c[field], Task.__table__.c[field].type)),
+                           else_=Task.__table__.c[field])
+               for field in BULK_UPDATE_FIELDS},
+            version=Task.version + 1,
+        )
+        .returning(Task)
+        .execution_options(synchronize_session=False)
+    )
+    async with db.begin():
+        updated = {task.id: task for task in (await db.scalars(statement)).all()}
+        missed = [item.id for item in items if item.id not in updated]
+        # Отличаем конфликт версий от чужой или отсутствующей задачи
+        versions = dict((await db.execute(
+            select(Task.id, Task.version).filter(Task.id.in_(missed), Task.user_id == user_id)
+        )).all()) if missed else {}
+    logger.info(f"Updated {len(updated)} of {len(items)} tasks of user {user_id}")
+    if updated:
+        await bump_task_list_generation(user_id)
+    await schedule_task_reminders(list(updated.values()))
+
+    results = []
+    for index, item in enumerate(items):
+        if index in duplicates:
+            results.append({"index": index, "id": item.id, "result": "duplicate"})
+        elif item.id in updated:
+            results.append({"index": index, "id": item.id, "result": "updated", "task": updated[item.id]})
+        elif item.id in versions:
+            results.append({"index": index, "id": item.id, "result": "conflict", "version": versions[item.id]})
+        else:
+            results.append({"index": index, "id": item.id, "result": "not_found"})
+    return results
+
+
+async def bulk_update_status(db: AsyncSession, user_id: int, ids: list[int], status: TaskStatus) -> list[dict]:
+    """
+    Change status of many tasks with one UPDATE
+    :param db: session
+    :param user_id: User id
+    :param ids: Task ids
+    :param status: New status
+    :return: list[dict]: Result for each item
+    """
+    statement = (
+        update(Task)
+        .where(Task.id.in_(ids), Task.user_id == user_id)
+        .values(status=status, version=Task.version + 1)
+        .returning(Task)
+        .execution_options(synchronize_session=False)
+    )
+    async with db.begin():
+        updated = {task.id: task for task in (await db.scalars(statement)).all()}
+    logger.info(f"Changed status of {len(updated)} of {len(ids)} tasks of user {user_id} to {status}")
+    if updated:
+        await bump_task_list_generation(user_id)
+    await schedule_task_reminders(list(updated.values()))
+    return bulk_results(ids, updated, "updated")
+
+
+async def bulk_delete_tasks(db: AsyncSession, user_id: int, ids: list[int]) -> list[dict]:
+    """
+    Delete many tasks with one DELETE and log deletions for changes sync
+    :param db: session
+    :param user_id: User id
+    :param ids: Task ids
+    :return: list[dict]: Result for each item
+    """
+    statement = (
+        delete(Task)
+        .where(Task.id.in_(ids), Task.user_id == user_id)
+        .returning(Task)
+        .execution_options(synchronize_session=False)
+    )
+    async with db.begin():
+        deleted = {task.id: task for task in (await db.scalars(statement)).all()}
+        if deleted:
+            await db.execute(insert(TaskDeletion),
+                             [{"task_id": task_id, "user_id": user_id} for task_id in deleted])
+    logger.info(f"Deleted {len(deleted)} of {len(ids)} tasks of user {user_id}")
+    if deleted:
+        await bump_task_list_generation(user_id)
+    await schedule_task_reminders(list(deleted.values()), deleted=True)
+    return bulk_results(ids, deleted, "deleted")
+
+
+def bulk_results(ids: list[int], processed: dict[int, Task], result: str) -> list[dict]:
+    """
+    Build per item results of bulk operation by ids
+    :param ids: Task ids from request
+    :param processed: Processed tasks by id
+    :param result: Result of processed item
+    :return: list[dict]: Result for each item
+    """
+    duplicates = find_duplicates(ids)
+    results = []
+    for index, task_id in enumerate(ids):
+        if index in duplicates:
+            results.append({"index": index, "id": task_id, "result": "duplicate"})
+        elif task_id in processed:
+            results.append({"index": index, "id": task_id, "result": result, "task": processed[task_id]})
+        else:
+            results.append({"index": index, "id": task_id, "result": "not_found"})
+    return results
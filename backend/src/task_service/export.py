@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+
+from src.shared.logger_setup import setup_logger
+from src.task_service import crud
+from src.task_service.schemas import ExportFormat
+
+logger = setup_logger(__name__)
+
+EXPORT_COLUMNS = [column.name for column in crud.TASK_COLUMNS]
+MEDIA_TYPES = {ExportFormat.NDJSON: "application/x-ndjson", ExportFormat.CSV: "text/csv"}
+
+
+def export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def encode_ndjson(rows) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, map(export_value, row))), ensure_ascii=False) + "\n" for row in rows
+    ).encode()
+
+
+def encode_csv(rows, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows([map(export_value, row) for row in rows])
+    return buffer.getvalue().encode()
+
+
+async def export_tasks(export_format: ExportFormat, user_id: int | None = None):
+    """
+    Encode tasks chunk by chunk, memory does not depend on number of tasks
+    :param export_format: NDJSON or CSV
+    :param user_id: User id, None - tasks of all users
+    :return: AsyncIterator of encoded chunks
+    """
+    exported = 0
+    if export_format == ExportFormat.CSV:
+        yield encode_csv([], header=True)
+    async for rows in crud.stream_tasks(user_id):
+        exported += len(rows)
+        yield encode_ndjson(rows) if export_format == ExportFormat.NDJSON else encode_csv(rows)
+    logger.info(f"Exported {exported} tasks of user {user_id if user_id is not None else 'all'}")
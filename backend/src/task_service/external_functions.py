@@ -2,6 +2,7 @@ import httpx
 from httpx import Response
 
 from src.session_service.endpoints import CHECK_AUTH
+from src.shared.http_client import get_http_client
 from src.shared.logger_setup import setup_logger
 from src.shared.schemas import TokenModelResponse
 from src.task_service.endpoints import GET_SESSION_BY_TOKEN
@@ -24,11 +25,11 @@ async def check_auth_from_external_service(access_token: str, skip_auth: bool =
             "X-Skip-Auth": str(skip_auth)
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(CHECK_AUTH, headers=headers)
-            response.raise_for_status()  # Проверяем статусный код на ошибки
-            json_data = response.json()
-            return json_data
+        client = get_http_client()
+        response = await client.get(CHECK_AUTH, headers=headers)
+        response.raise_for_status()  # Проверяем статусный код на ошибки
+        json_data = response.json()
+        return json_data
     except httpx.RequestError as e:
         logger.error(f"An error occurred while requesting {e.request.url!r}.")
     except httpx.HTTPStatusError as e:
@@ -47,10 +48,10 @@ async def get_session_by_token(token: str, token_type: str = "access_token") ->
     headers = {
         "content-type": "application/json",
     }
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{GET_SESSION_BY_TOKEN}?token={token}&token_type={token_type}",
-            headers=headers
-        )
-        logger.info(f"Get session by token {token} with type {token_type} with response: {response.json()}")
-        return response
\ No newline at end of file
+    client = get_http_client()
+    response = await client.get(
+        f"{GET_SESSION_BY_TOKEN}?token={token}&token_type={token_type}",
+        headers=headers
+    )
+    logger.info(f"Get session by token {token} with type {token_type} with response: {response.json()}")
+    return response
\ No newline at end of file
@@ -1,13 +1,56 @@
+import asyncio
 import json
+import time
+from collections import defaultdict
 
 from aiokafka import AIOKafkaConsumer
-from socketio import AsyncServer
 
 from src.shared.config import settings
 from src.shared.logger_setup import setup_logger
 from src.task_service.main import sio
 
 logger = setup_logger(__name__)
+
+# Метрики консьюмера: лаг по последней пачке и время ее обработки
+consumer_stats = {"batches": 0, "records": 0, "lag": 0, "last_batch_latency_ms": 0.0}
+
+
+async def emit_room(room: str, events: list[dict], semaphore: asyncio.Semaphore):
+    """
+    Emit events to room keeping their order
+    :param room: Socket.io room
+    :param events: Events for room
+    :param semaphore: Limit of concurrent emits
+    """
+    async with semaphore:
+        for event in events:
+            try:
+                await sio.emit('task_remind', event, room=room)
+            except Exception as e:
+                logger.error(f"Message processing failed: {str(e)}")
+
+
+def group_by_room(records) -> dict[str, list[dict]]:
+    """
+    Group Kafka records by user room
+    :param records: Kafka records
+    :return: dict of room -> events
+    """
+    rooms = defaultdict(list)
+    for msg in records:
+        try:
+            data = json.loads(msg.value.decode())
+            rooms[f"user_{data['user']}"].append({
+                'message': data,
+                'timestamp': msg.timestamp
+            })
+        except json.JSONDecodeError:
+            logger.error("Invalid JSON in Kafka message")
+        except Exception as e:
+            logger.error(f"Message processing failed: {str(e)}")
+    return rooms
+
+
 async def consume_kafka_messages():
     consumer = AIOKafkaConsumer(
         settings.kafka_task_remind_topic_name,
@@ -15,20 +58,28 @@ async def consume_kafka_messages():
         group_id="readers",
         auto_offset_reset='latest'
     )
+    semaphore = asyncio.Semaphore(settings.task_remind_emit_concurrency)
 
     await consumer.start()
     try:
-        async for msg in consumer:
-            try:
-                data = json.loads(msg.value.decode())
-                await sio.emit('task_remind', {
-                    'message': data,
-                    'timestamp': msg.timestamp
-                }, room=f"user_{data['user']}")
-            except json.JSONDecodeError:
-                logger.error("Invalid JSON in Kafka message")
-            except Exception as e:
-                logger.error(f"Message processing failed: {str(e)}")
+        while True:
+            batches = await consumer.getmany(timeout_ms=settings.kafka_consumer_timeout_ms,
+                                             max_records=settings.kafka_consumer_max_records)
+            if not batches:
+                continue
+            started = time.perf_counter()
+            records = [msg for partition_records in batches.values() for msg in partition_records]
+            rooms = group_by_room(records)
+            await asyncio.gather(*(emit_room(room, events, semaphore) for room, events in rooms.items()))
+
+            consumer_stats["batches"] += 1
+            consumer_stats["records"] += len(records)
+            consumer_stats["lag"] = sum(
+                max(0, (consumer.highwater(tp) or 0) - (partition_records[-1].offset + 1))
+                for tp, partition_records in batches.items()
+            )
+            consumer_stats["last_batch_latency_ms"] = (time.perf_counter() - started) * 1000
+            logger.info(f"Emitted {len(records)} reminders to {len(rooms)} rooms, stats: {consumer_stats}")
     finally:
         await consumer.stop()
-        logger.info("Kafka consumer disconnected")
\ No newline at end of file
+        logger.info("Kafka consumer disconnected")
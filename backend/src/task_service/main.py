@@ -1,6 +1,8 @@
 import asyncio
 from contextlib import asynccontextmanager
 
+from src.shared.http_client import get_http_client, close_http_client
+from src.shared.local_auth import listen_session_invalidations
 from src.shared.logger_setup import setup_logger
 from src.task_service.router import task_router
 
@@ -9,7 +11,22 @@ logger = setup_logger(__name__)
 # Создаем FastAPI
 
 from fastapi import FastAPI
-from socketio import ASGIApp, AsyncServer
+from socketio import ASGIApp, AsyncServer, AsyncRedisManager, AsyncManager
+
+from src.shared.config import settings
+
+
+def create_client_manager() -> AsyncManager | None:
+    """
+    Create socket.io client manager by settings.
+    With redis manager emits to room reach clients connected to any task_service instance
+    :return: AsyncManager | None: None - default in-memory manager
+    """
+    if settings.socketio_manager == "redis":
+        url = settings.socketio_redis_url or \
+            f"redis://:{settings.redis_password}@{settings.redis_host}:{settings.redis_port}/{settings.redis_db}"
+        return AsyncRedisManager(url, channel=settings.socketio_channel, logger=logger)
+    return None
 
 
 def socketio_mount(
@@ -24,6 +41,7 @@ def socketio_mount(
 
     sio = AsyncServer(async_mode=async_mode,
                       cors_allowed_origins=cors_allowed_origins,
+                      client_manager=create_client_manager(),
                       logger=logger,
                       engineio_logger=logger, **kwargs)
 
@@ -38,9 +56,11 @@ def socketio_mount(
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    get_http_client()
     # Запускаем консьюмер при старте
     logger.info("Kafka started")
     consumer_task = asyncio.create_task(consume_kafka_messages())
+    invalidations_task = asyncio.create_task(listen_session_invalidations())
 
     yield  # Здесь работает приложение
 
@@ -50,6 +70,12 @@ async def lifespan(app: FastAPI):
         await consumer_task
     except asyncio.CancelledError:
         logger.info("Kafka consumer stopped gracefully")
+    invalidations_task.cancel()
+    try:
+        await invalidations_task
+    except asyncio.CancelledError:
+        logger.info("Stopped session invalidations listener")
+    await close_http_client()
 
 fastapi_app = FastAPI(title="Task Service", lifespan=lifespan)
 fastapi_app.include_router(task_router)
@@ -4,17 +4,19 @@ import redis.asyncio as aioredis
 from src.shared.config import settings
 
 
-def get_redis_client():
+def get_redis_client(decode_responses: bool = True):
     return aioredis.Redis(
         host=settings.redis_host,
         port=settings.redis_port,
         password=settings.redis_password,
         db=settings.redis_db,
-        decode_responses=True
+        decode_responses=decode_responses
     )
 
 
 redis_client = get_redis_client()
+# Клиент для готовых JSON байтов кэша списков задач
+cache_redis_client = get_redis_client(decode_responses=False)
 
 
 def check_redis_connection():
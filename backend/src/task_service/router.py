@@ -1,18 +1,25 @@
+import json
 import os
 import time
 from datetime import datetime
 
-from fastapi import HTTPException, status, APIRouter, Depends, Request
+from fastapi import HTTPException, status, APIRouter, Depends, Request, Response, Query
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.session_service.external_functions import check_auth_from_external_service, find_user_by_email
 from src.shared import logger_setup
-from src.shared.common_functions import decode_token, verify_response
+from src.shared.common_functions import decode_token, verify_response, get_token_user_id
+from src.shared.config import settings
 from src.shared.database import SessionLocal
+from src.shared.local_auth import verify_token_locally
+from src.shared.models import TaskStatus
 from src.shared.schemas import AuthResponse, UserDTO, TaskDTO
-from src.task_service import crud
-from src.task_service.schemas import TaskCreate
+from src.task_service import crud, task_cache
+from src.task_service.export import export_tasks, MEDIA_TYPES
+from src.task_service.schemas import TaskCreate, TaskSort, ExportFormat, TaskBulkCreate, TaskBulkUpdate, TaskBulkDelete, \
+    TaskBulkStatus
 
 task_router = APIRouter()
 logger = logger_setup.setup_logger(__name__)
@@ -30,12 +37,47 @@ async def get_valid_token(request: Request, credentials: HTTPAuthorizationCreden
     if request.headers.get("X-Skip-Auth") == "True":
         logger.info("Skip authentication check")
         return credentials.credentials
+    token = await verify_token_locally(credentials.credentials)
+    if token:
+        return token
     verify_result = await check_auth_from_external_service(credentials.credentials)
     logger.info(f"Verify result {verify_result}")
     if not verify_result or not verify_result["token"]:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     return verify_result["token"]
 
+async def get_user_id(payload: dict, result: AuthResponse) -> int:
+    """
+    Get user id from token payload, old tokens without uid claim are resolved by email
+    :param payload: Decoded token payload
+    :param result: Response for errors
+    :return: int: User id
+    """
+    user_id = get_token_user_id(payload)
+    if user_id is not None:
+        return user_id
+    response = await find_user_by_email(payload["sub"])
+    error = verify_response(response)
+    if error:
+        logger.error(f"Error finding user by email: {error}")
+        result.data = {"message": f"Error finding user by email: {error['detail']}"}
+        raise HTTPException(status_code=error["status_code"], detail=result.model_dump())
+    user = UserDTO(**response.json())
+    logger.info(f"User found: {user}")
+    return user.id
+
+def bulk_response(token: str, results: list[dict]) -> dict:
+    """
+    Build response of bulk operation
+    :param token: User token
+    :param results: Result for each item
+    :return: dict: AuthResponse with item results
+    """
+    for item in results:
+        if "task" in item:
+            item["task"] = TaskDTO.model_validate(item["task"])
+    return AuthResponse(token=token, data=results).model_dump(by_alias=True)
+
 async def get_db():
     async with SessionLocal() as db:
         try:
@@ -61,16 +103,9 @@ async def create_task(task_data: TaskCreate, token = Depends(get_valid_token), d
         raise HTTPException(status_code=401, detail=result.model_dump())
     logger.info(f"Decoded token payload: {payload}")
 
-    response = await find_user_by_email(payload["sub"])
-    error = verify_response(response)
-    if error:
-        logger.error(f"Error finding user by email: {error}")
-        result.data = {"message": f"Error finding user by email: {error['detail']}"}
-        raise HTTPException(status_code=error["status"], detail=result.model_dump())
-    user = UserDTO(**response.json())
-    logger.info(f"User found: {user}")
+    user_id = await get_user_id(payload, result)
 
-    task = await crud.create_task(task_data, user.id, db)
+    task = await crud.create_task(task_data, user_id, db)
     if not task:
         logger.error("Task creation failed")
         result.data = {"message": "Task creation failed"}
@@ -80,10 +115,59 @@ async def create_task(task_data: TaskCreate, token = Depends(get_valid_token), d
         token=token,
         data=task.to_dict(),
     ).model_dump(by_alias=True)
+async def get_cached_tasks_me(request: Request, token: str, sent_token: str, user_id: int,
+                              db: AsyncSession) -> Response:
+    """
+    Get full task list of user from cache, answer 304 if client already has current list
+    :param request: Request for If-None-Match header
+    :param token: User token
+    :param sent_token: Token sent by client
+    :param user_id: User id
+    :param db: session
+    :return: Response with encoded AuthResponse
+    """
+    # Новый токен должен попасть в тело ответа, поэтому 304 только для того же токена
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and token == sent_token:
+        generation = await task_cache.get_task_list_generation(user_id)
+        etag = task_cache.make_etag(user_id, generation)
+        if etag in [value.strip() for value in if_none_match.split(",")]:
+            await task_cache.not_modified(user_id, generation)
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    generation, data = await task_cache.get_cached_task_list(user_id)
+    if data is None:
+        tasks, _ = await crud.get_tasks_page(db, user_id)
+        data = task_cache.encode_task_list(tasks)
+        await task_cache.set_cached_task_list(user_id, generation, data)
+    content = b'{"token":' + json.dumps(token).encode() + b',"data":' + data + b'}'
+    return Response(content=content, media_type="application/json",
+                    headers={"ETag": task_cache.make_etag(user_id, generation)})
+
 @task_router.get("/task/me", status_code=status.HTTP_200_OK, response_model=AuthResponse)
-async def get_tasks_me(token:str = Depends(get_valid_token),db: AsyncSession = Depends(get_db)):
+async def get_tasks_me(request: Request, response: Response,
+                       limit: int | None = Query(None, ge=1, le=settings.task_page_max_limit),
+                       cursor: str | None = None,
+                       task_status: TaskStatus | None = Query(None, alias="status"),
+                       fulfilled_from: datetime | None = None,
+                       fulfilled_to: datetime | None = None,
+                       sort: TaskSort = TaskSort.ID,
+                       descending: bool = False,
+                       credentials: HTTPAuthorizationCredentials = Depends(bearer),
+                       token:str = Depends(get_valid_token),db: AsyncSession = Depends(get_db)):
     """
-    Get tasks for the current user
+    Get tasks for the current user. With limit tasks are returned by pages,
+    cursor of next page is sent in X-Next-Cursor header. Full list is cached and supports If-None-Match
+    :param request: Request for If-None-Match header
+    :param response: Response for headers
+    :param limit: Page size
+    :param cursor: Cursor of page from X-Next-Cursor header
+    :param task_status: Status filter
+    :param fulfilled_from: Minimal fulfilled date
+    :param fulfilled_to: Maximal fulfilled date
+    :param sort: Sort field
+    :param descending: Sort direction
+    :param credentials: Token sent by client
     :param token: User token
     :param db: session
     :return: list of TaskDTO
@@ -96,22 +180,252 @@ async def get_tasks_me(token:str = Depends(get_valid_token),db: AsyncSession = D
         raise HTTPException(status_code=401, detail=result.model_dump())
     logger.info(f"Decoded token payload: {payload}")
 
-    response = await find_user_by_email(payload["sub"])
-    error = verify_response(response)
-    if error:
-        logger.error(f"Error finding user by email: {error}")
-        result.data = {"message": f"Error finding user by email: {error['detail']}"}
-        raise HTTPException(status_code=error["status"], detail=result.model_dump())
-    user = UserDTO(**response.json())
-    logger.info(f"User found: {user}")
+    user_id = await get_user_id(payload, result)
+
+    if (settings.task_list_cache_enabled and limit is None and cursor is None and task_status is None
+            and fulfilled_from is None and fulfilled_to is None and sort == TaskSort.ID and not descending):
+        return await get_cached_tasks_me(request, token, credentials.credentials, user_id, db)
+
+    position = None
+    if cursor:
+        position = crud.decode_cursor(cursor, sort)
+        if not position:
+            logger.error(f"Invalid cursor {cursor}")
+            result.data = {"message": "Invalid cursor"}
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=result.model_dump())
 
-    tasks = await crud.get_tasks_by_user_id(db, user.id)
-    logger.info(f"Tasks retrieved: {tasks}")
+    tasks, next_cursor = await crud.get_tasks_page(db, user_id, limit, position, task_status,
+                                                   fulfilled_from, fulfilled_to, sort, descending)
+    logger.info(f"Tasks retrieved: {len(tasks)}")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return AuthResponse(
         token=token,
-        data=[TaskDTO(**task.to_dict()) for task in tasks],
+        data=[TaskDTO.model_validate(task) for task in tasks],
     ).model_dump(by_alias=True)
 
+@task_router.get("/task/me/changes", status_code=status.HTTP_200_OK, response_model=AuthResponse)
+async def get_task_changes(since: str | None = None, token: str = Depends(get_valid_token),
+                           db: AsyncSession = Depends(get_db)):
+    """
+    Get tasks changed since previous sync. Without since or with expired cursor all tasks
+    are returned with reset flag and client must replace its list
+    :param since: Cursor from previous response
+    :param token: User token
+    :param db: session
+    :return: changed TaskDTO, deleted task ids and new cursor
+    """
+    payload = decode_token(token)
+    result = AuthResponse(token=token, data={"message": ""})
+    if not payload or not payload["sub"]:
+        result.data = {"message": "Invalid or expired token"}
+        logger.error("Invalid token payload")
+        raise HTTPException(status_code=401, detail=result.model_dump())
+    logger.info(f"Decoded token payload: {payload}")
+
+    user_id = await get_user_id(payload, result)
+
+    moment = None
+    if since:
+        moment = crud.decode_changes_cursor(since)
+        if not moment:
+            logger.error(f"Invalid cursor {since}")
+            result.data = {"message": "Invalid cursor"}
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=result.model_dump())
+
+    tasks, deleted, cursor, reset = await crud.get_task_changes(db, user_id, moment)
+    return AuthResponse(
+        token=token,
+        data={
+            "tasks": [TaskDTO.model_validate(task) for task in tasks],
+            "deleted": deleted,
+            "cursor": cursor,
+            "reset": reset,
+        },
+    ).model_dump(by_alias=True)
+
+@task_router.get("/task/me/search", status_code=status.HTTP_200_OK, response_model=AuthResponse)
+async def search_tasks_me(response: Response,
+                          q: str = Query(min_length=1),
+                          limit: int = Query(20, ge=1, le=settings.task_page_max_limit),
+                          cursor: str | None = None,
+                          task_status: TaskStatus | None = Query(None, alias="status"),
+                          fulfilled_from: datetime | None = None,
+                          fulfilled_to: datetime | None = None,
+                          token: str = Depends(get_valid_token), db: AsyncSession = Depends(get_db)):
+    """
+    Search tasks of the current user by words prefixes in title and description, best matches first.
+    Cursor of next page is sent in X-Next-Cursor header
+    :param response: Response for headers
+    :param q: Search text
+    :param limit: Page size
+    :param cursor: Cursor of page from X-Next-Cursor header
+    :param task_status: Status filter
+    :param fulfilled_from: Minimal fulfilled date
+    :param fulfilled_to: Maximal fulfilled date
+    :param token: User token
+    :param db: session
+    :return: list of TaskDTO
+    """
+    payload = decode_token(token)
+    result = AuthResponse(token=token, data={"message": ""})
+    if not payload or not payload["sub"]:
+        result.data = {"message": "Invalid or expired token"}
+        logger.error("Invalid token payload")
+        raise HTTPException(status_code=401, detail=result.model_dump())
+    logger.info(f"Decoded token payload: {payload}")
+
+    user_id = await get_user_id(payload, result)
+
+    position = None
+    if cursor:
+        position = crud.decode_search_cursor(cursor)
+        if not position:
+            logger.error(f"Invalid cursor {cursor}")
+            result.data = {"message": "Invalid cursor"}
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=result.model_dump())
+
+    tasks, next_cursor = await crud.search_tasks(db, user_id, q, limit, position, task_status,
+                                                 fulfilled_from, fulfilled_to)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return AuthResponse(
+        token=token,
+        data=[TaskDTO.model_validate(task) for task in tasks],
+    ).model_dump(by_alias=True)
+
+@task_router.get("/task/me/export", status_code=status.HTTP_200_OK)
+async def export_tasks_me(export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+                          all_users: bool = False, token: str = Depends(get_valid_token)):
+    """
+    Stream tasks of current user, or tasks of all users for superuser, as NDJSON or CSV
+    :param export_format: ndjson or csv
+    :param all_users: Export tasks of all users
+    :param token: User token
+    :return: StreamingResponse
+    """
+    payload = decode_token(token)
+    result = AuthResponse(token=token, data={"message": ""})
+    if not payload or not payload["sub"]:
+        result.data = {"message": "Invalid or expired token"}
+        logger.error("Invalid token payload")
+        raise HTTPException(status_code=401, detail=result.model_dump())
+    logger.info(f"Decoded token payload: {payload}")
+
+    if all_users:
+        response = await find_user_by_email(payload["sub"])
+        error = verify_response(response)
+        if error:
+            logger.error(f"Error finding user by email: {error}")
+            result.data = {"message": f"Error finding user by email: {error['detail']}"}
+            raise HTTPException(status_code=error["status_code"], detail=result.model_dump())
+        user = UserDTO(**response.json())
+        if not user.is_superuser:
+            logger.error(f"User {user.id} is not allowed to export all tasks")
+            result.data = {"message": "Not enough permissions"}
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=result.model_dump())
+        user_id = None
+    else:
+        user_id = await get_user_id(payload, result)
+
+    return StreamingResponse(
+        export_tasks(export_format, user_id),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{export_format.value}"'},
+    )
+
+@task_router.post("/task/me/bulk", status_code=status.HTTP_201_CREATED, response_model=AuthResponse)
+async def bulk_create_tasks(bulk_data: TaskBulkCreate, token: str = Depends(get_valid_token),
+                            db: AsyncSession = Depends(get_db)):
+    """
+    Create many tasks in one transaction
+    :param bulk_data: New tasks
+    :param token: User token
+    :param db: session
+    :return: result for each task
+    """
+    payload = decode_token(token)
+    result = AuthResponse(token=token, data={"message": ""})
+    if not payload or not payload["sub"]:
+        result.data = {"message": "Invalid or expired token"}
+        logger.error("Invalid token payload")
+        raise HTTPException(status_code=401, detail=result.model_dump())
+    logger.info(f"Decoded token payload: {payload}")
+
+    user_id = await get_user_id(payload, result)
+
+    results = await crud.bulk_create_tasks(db, user_id, bulk_data.tasks)
+    return bulk_response(token, results)
+
+@task_router.patch("/task/me/bulk", status_code=status.HTTP_200_OK, response_model=AuthResponse)
+async def bulk_update_tasks(bulk_data: TaskBulkUpdate, token: str = Depends(get_valid_token),
+                            db: AsyncSession = Depends(get_db)):
+    """
+    Update many tasks in one transaction, task with outdated version is not updated
+    :param bulk_data: Tasks with id and version
+    :param token: User token
+    :param db: session
+    :return: result for each task
+    """
+    payload = decode_token(token)
+    result = AuthResponse(token=token, data={"message": ""})
+    if not payload or not payload["sub"]:
+        result.data = {"message": "Invalid or expired token"}
+        logger.error("Invalid token payload")
+        raise HTTPException(status_code=401, detail=result.model_dump())
+    logger.info(f"Decoded token payload: {payload}")
+
+    user_id = await get_user_id(payload, result)
+
+    results = await crud.bulk_update_tasks(db, user_id, bulk_data.tasks)
+    return bulk_response(token, results)
+
+@task_router.post("/task/me/bulk/status", status_code=status.HTTP_200_OK, response_model=AuthResponse)
+async def bulk_update_status(bulk_data: TaskBulkStatus, token: str = Depends(get_valid_token),
+                             db: AsyncSession = Depends(get_db)):
+    """
+    Change status of many tasks in one transaction
+    :param bulk_data: Task ids and new status
+    :param token: User token
+    :param db: session
+    :return: result for each task
+    """
+    payload = decode_token(token)
+    result = AuthResponse(token=token, data={"message": ""})
+    if not payload or not payload["sub"]:
+        result.data = {"message": "Invalid or expired token"}
+        logger.error("Invalid token payload")
+        raise HTTPException(status_code=401, detail=result.model_dump())
+    logger.info(f"Decoded token payload: {payload}")
+
+    user_id = await get_user_id(payload, result)
+
+    results = await crud.bulk_update_status(db, user_id, bulk_data.ids, bulk_data.status)
+    return bulk_response(token, results)
+
+@task_router.post("/task/me/bulk/delete", status_code=status.HTTP_200_OK, response_model=AuthResponse)
+async def bulk_delete_tasks(bulk_data: TaskBulkDelete, token: str = Depends(get_valid_token),
+                            db: AsyncSession = Depends(get_db)):
+    """
+    Delete many tasks in one transaction
+    :param bulk_data: Task ids
+    :param token: User token
+    :param db: session
+    :return: result for each task
+    """
+    payload = decode_token(token)
+    result = AuthResponse(token=token, data={"message": ""})
+    if not payload or not payload["sub"]:
+        result.data = {"message": "Invalid or expired token"}
+        logger.error("Invalid token payload")
+        raise HTTPException(status_code=401, detail=result.model_dump())
+    logger.info(f"Decoded token payload: {payload}")
+
+    user_id = await get_user_id(payload, result)
+
+    results = await crud.bulk_delete_tasks(db, user_id, bulk_data.ids)
+    return bulk_response(token, results)
+
 @task_router.delete("/task/me/{task_id}", status_code=status.HTTP_200_OK, response_model=AuthResponse)
 async def delete_task_by_id(task_id: int, token: str = Depends(get_valid_token), db: AsyncSession = Depends(get_db)):
     """
@@ -129,16 +443,9 @@ async def delete_task_by_id(task_id: int, token: str = Depends(get_valid_token),
         raise HTTPException(status_code=401, detail=result)
     logger.info(f"Decoded token payload: {payload}")
 
-    response = await find_user_by_email(payload["sub"])
-    error = verify_response(response)
-    if error:
-        logger.error(f"Error finding user by email: {error}")
-        result.data = {"message": f"Error finding user by email: {error['detail']}"}
-        raise HTTPException(status_code=error["status"], detail=result.model_dump())
-    user = UserDTO(**response.json())
-    logger.info(f"User found: {user}")
+    user_id = await get_user_id(payload, result)
 
-    task = await crud.delete_task_by_id(db, task_id)
+    task = await crud.delete_task_by_id(db, task_id, user_id)
     if not task:
         logger.error("Task deletion failed")
         result.data = {"message": "Task deletion failed"}
@@ -168,26 +475,17 @@ async def update_task_by_id(task_id: int, task_data: TaskCreate, token: str = De
     logger.info(f"Decoded token payload: {payload}")
 
 
-    response = await find_user_by_email(payload["sub"])
-    error = verify_response(response)
-    if error:
-        logger.error(f"Error finding user by email: {error}")
-        result.data = {"message": f"Error finding user by email: {error['detail']}"}
-        raise HTTPException(status_code=error["status"], detail=result.model_dump())
-    user = UserDTO(**response.json())
-    logger.info(f"User found: {user}")
-
-    task = await crud.get_task_by_id(db, task_id)
-    if task.version > task_data.version:
-        logger.error(f"Task {task.to_dict()} was already updated")
-        result.data = {"message": f"Task was already updated"}
-        raise HTTPException(status_code=400, detail=result.model_dump())
+    user_id = await get_user_id(payload, result)
 
-    task = await crud.update_task_by_id(db, task_id, task_data)
-    if not task:
+    task, current_version = await crud.update_task_by_id(db, task_id, user_id, task_data)
+    if current_version is None:
         logger.error("Task update failed")
         result.data = {"message": "Task update failed"}
         raise HTTPException(status_code=404, detail=result.model_dump())
+    if not task:
+        logger.error(f"Task {task_id} was already updated, current version {current_version}")
+        result.data = {"message": f"Task was already updated", "version": current_version}
+        raise HTTPException(status_code=400, detail=result.model_dump())
     logger.info(f"Task updated: {task}")
     return AuthResponse(
         token=token,
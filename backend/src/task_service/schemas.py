@@ -1,7 +1,9 @@
 from datetime import datetime
+from enum import Enum
 
 from pydantic import BaseModel, AliasChoices, Field
 
+from src.shared.config import settings
 from src.shared.models import TaskStatus
 
 
@@ -11,3 +13,38 @@ class TaskCreate(BaseModel):
     status: TaskStatus = TaskStatus.IN_PROGRESS
     fulfilled_date: datetime | None = Field(None,validation_alias=AliasChoices('fulfilled_date', 'fulfilledDate'))
     version: int | None = None
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class TaskSort(str, Enum):
+    ID = "id"
+    UPDATED_AT = "updated_at"
+
+
+class TaskUpdateItem(TaskCreate):
+    id: int
+    version: int
+
+
+class TaskBulkCreate(BaseModel):
+    tasks: list[TaskCreate] = Field(min_length=1, max_length=settings.task_bulk_max_items)
+
+
+class TaskBulkUpdate(BaseModel):
+    tasks: list[TaskUpdateItem] = Field(min_length=1, max_length=settings.task_bulk_max_items)
+
+
+class TaskBulkIds(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=settings.task_bulk_max_items)
+
+
+class TaskBulkDelete(TaskBulkIds):
+    pass
+
+
+class TaskBulkStatus(TaskBulkIds):
+    status: TaskStatus
@@ -0,0 +1,110 @@
+from pydantic import TypeAdapter
+
+from src.shared.config import settings
+from src.shared.logger_setup import setup_logger
+from src.shared.models import Task
+from src.shared.schemas import TaskDTO
+from src.task_service.redis_base import cache_redis_client
+
+logger = setup_logger(__name__)
+
+task_list_adapter = TypeAdapter(list[TaskDTO])
+
+# Счетчики кэша списков задач
+task_list_cache_stats = {"hits": 0, "misses": 0, "not_modified": 0, "bytes_served": 0, "bytes_saved": 0}
+
+
+def task_list_generation_key(user_id: int) -> str:
+    return f"task_list:{user_id}:generation"
+
+
+def task_list_cache_key(user_id: int) -> str:
+    return f"task_list:{user_id}:cache"
+
+
+def make_etag(user_id: int, generation: int) -> str:
+    return f'"{user_id}-{generation}"'
+
+
+def encode_task_list(tasks: list[Task]) -> bytes:
+    """
+    Serialize tasks to JSON once
+    :param tasks: Tasks
+    :return: bytes: JSON list of TaskDTO
+    """
+    return task_list_adapter.dump_json([TaskDTO.model_validate(task) for task in tasks], by_alias=True)
+
+
+def log_stats():
+    requests = task_list_cache_stats["hits"] + task_list_cache_stats["misses"] + task_list_cache_stats["not_modified"]
+    hit_rate = (requests - task_list_cache_stats["misses"]) / requests if requests else 0.0
+    logger.info(f"Task list cache hit rate {hit_rate:.2%}, stats: {task_list_cache_stats}")
+
+
+async def get_task_list_generation(user_id: int) -> int:
+    """
+    Get generation of user task list, it changes after every write
+    :param user_id: User id
+    :return: int: Generation
+    """
+    generation = await cache_redis_client.get(task_list_generation_key(user_id))
+    return int(generation or 0)
+
+
+async def get_cached_task_list(user_id: int) -> tuple[int, bytes | None]:
+    """
+    Get current generation and cached task list of this generation in one round trip
+    :param user_id: User id
+    :return: (generation, JSON bytes or None on miss)
+    """
+    async with cache_redis_client.pipeline(transaction=False) as pipe:
+        pipe.get(task_list_generation_key(user_id))
+        pipe.hmget(task_list_cache_key(user_id), "generation", "data")
+        generation, (cached_generation, data) = await pipe.execute()
+    generation = int(generation or 0)
+    if data is None or int(cached_generation) != generation:
+        task_list_cache_stats["misses"] += 1
+        return generation, None
+    task_list_cache_stats["hits"] += 1
+    task_list_cache_stats["bytes_served"] += len(data)
+    log_stats()
+    return generation, data
+
+
+async def set_cached_task_list(user_id: int, generation: int, data: bytes):
+    """
+    Save task list read after generation was taken. If list was changed meanwhile,
+    generation is already bumped and entry will not be used
+    :param user_id: User id
+    :param generation: Generation taken before reading tasks
+    :param data: JSON bytes
+    """
+    async with cache_redis_client.pipeline(transaction=False) as pipe:
+        pipe.hset(task_list_cache_key(user_id), mapping={"generation": generation, "data": data})
+        pipe.expire(task_list_cache_key(user_id), settings.task_list_cache_ttl_seconds)
+        await pipe.execute()
+    log_stats()
+
+
+async def not_modified(user_id: int, generation: int):
+    """
+    Count response without body
+    :param user_id: User id
+    :param generation: Current generation
+    """
+    task_list_cache_stats["not_modified"] += 1
+    async with cache_redis_client.pipeline(transaction=False) as pipe:
+        pipe.hget(task_list_cache_key(user_id), "generation")
+        pipe.hstrlen(task_list_cache_key(user_id), "data")
+        cached_generation, size = await pipe.execute()
+    if cached_generation is not None and int(cached_generation) == generation:
+        task_list_cache_stats["bytes_saved"] += size
+    log_stats()
+
+
+async def bump_task_list_generation(user_id: int):
+    """
+    Invalidate cached task list after tasks were changed
+    :param user_id: User id
+    """
+    await cache_redis_client.incr(task_list_generation_key(user_id))
@@ -1,6 +1,11 @@
+import time
 from datetime import datetime
 
-from src.shared.common_functions import verify_response
+from socketio.exceptions import ConnectionRefusedError
+
+from src.shared.common_functions import verify_response, decode_token, get_token_user_id
+from src.shared.config import settings
+from src.shared.local_auth import verify_token_locally, get_cached_session
 from src.shared.logger_setup import setup_logger
 from src.shared.schemas import SessionDTO
 from src.task_service.external_functions import get_session_by_token, check_auth_from_external_service
@@ -10,9 +15,65 @@ from src.task_service.main import sio  # Импортируем созданны
 logger = setup_logger(__name__)
 
 
+class TokenBucket:
+    """
+    Token bucket limiting rate of socket connects
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def acquire(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+connect_limiter = TokenBucket(settings.socket_connect_rate, settings.socket_connect_burst)
+
+
+async def get_connect_user_id(token: str) -> int | None:
+    """
+    Get user id of connecting client.
+    Token is verified locally and user is resolved by uid claim or cached session,
+    auth and session services are requested only if local check is not possible
+    :param token: Access token
+    :return: int | None: User id or None if token is invalid
+    """
+    if await verify_token_locally(token):
+        user_id = get_token_user_id(decode_token(token))
+        if user_id is not None:
+            return user_id
+        session = await get_cached_session(token)
+        return session.user_id if session else None
+
+    verify_result = await check_auth_from_external_service(token)
+    logger.info(f"Verify result {verify_result}")
+    if not verify_result or not verify_result["token"]:
+        return None
+    # Get user session with the token
+    response = await get_session_by_token(verify_result["token"])
+    error = verify_response(response)
+    if error:
+        logger.error(f"Error finding session by token: {error}")
+        return None
+    logger.info(f"Session response: {response.json()}")
+    return SessionDTO(**response.json()).user_id
+
 
 @sio.event
 async def connect(sid, environ):
+    # Отклоняем лавину переподключений, клиент повторит попытку позже
+    if not connect_limiter.acquire():
+        logger.warning(f"Connect rate limit exceeded, refused {sid}")
+        raise ConnectionRefusedError("Too many connections, retry later")
     try:
         logger.info(f"Client connecting: {sid}")
         # Send welcome message to the client
@@ -24,28 +85,18 @@ async def connect(sid, environ):
         logger.info(f"Client connected successfully: {sid}")
 
         # Check authorization token
-        token = environ.get('HTTP_AUTHORIZATION').split(' ')[1]
+        token = (environ.get('HTTP_AUTHORIZATION') or '').split(' ')[-1]
         if not token:
             logger.error(f"Authorization token missing for {sid}")
             await sio.disconnect(sid)
             return
         logger.info(f"Authorization token: {token}")
-        verify_result = await check_auth_from_external_service(token)
-        logger.info(f"Verify result {verify_result}")
-        if not verify_result or not verify_result["token"]:
+        user_id = await get_connect_user_id(token)
+        if user_id is None:
             await sio.disconnect(sid)
             return
 
-        # Get user session with the token
-        response = await get_session_by_token(verify_result["token"])
-        error = verify_response(response)
-        if error:
-            logger.error(f"Error finding session by token: {error}")
-            await sio.disconnect(sid)
-            return
-        logger.info(f"Session response: {response.json()}")
         # Add user to his session room
-        user_id = SessionDTO(**response.json()).user_id
         await sio.save_session(sid, {"user_id": user_id})
         await sio.enter_room(sid, f"user_{user_id}")
         logger.info(f"Session session id {user_id}")
@@ -1,7 +1,10 @@
+import asyncio
 import re
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 
 from passlib.context import CryptContext
 
+from src.shared.config import settings
 from src.shared.logger_setup import setup_logger
 
 logger = setup_logger(__name__)
@@ -11,11 +14,69 @@ def validate_password(password: str) -> bool:
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt выполняется вне event loop, число одновременных операций ограничено
+_password_executor: Executor | None = None
+_password_semaphore = asyncio.Semaphore(settings.password_max_concurrency)
+password_pool_stats = {"queued": 0, "running": 0, "completed": 0}
 
-def get_password_hash(password):
+
+def _hash_password(password):
     return pwd_context.hash(password)
 
 
-def verify_password(plain_password, hashed_password):
-    logger.info(f"{pwd_context.hash(plain_password)}, {hashed_password}")
+def _verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
+
+
+def get_password_executor() -> Executor:
+    """
+    Get executor for password hashing, thread or process pool by settings
+    :return: Executor
+    """
+    global _password_executor
+    if _password_executor is None:
+        if settings.password_executor == "process":
+            _password_executor = ProcessPoolExecutor(max_workers=settings.password_executor_workers)
+        else:
+            _password_executor = ThreadPoolExecutor(max_workers=settings.password_executor_workers,
+                                                    thread_name_prefix="password")
+        logger.info(f"Started {settings.password_executor} password executor "
+                    f"with {settings.password_executor_workers} workers")
+    return _password_executor
+
+
+def shutdown_password_executor():
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=True)
+        _password_executor = None
+
+
+async def _run_password_task(func, *args):
+    """
+    Run password function in executor with concurrency limit
+    :param func: Password function
+    :param args: Function arguments
+    :return: Function result
+    """
+    password_pool_stats["queued"] += 1
+    try:
+        await _password_semaphore.acquire()
+    finally:
+        password_pool_stats["queued"] -= 1
+    password_pool_stats["running"] += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_password_executor(), func, *args)
+    finally:
+        password_pool_stats["running"] -= 1
+        password_pool_stats["completed"] += 1
+        _password_semaphore.release()
+
+
+async def get_password_hash(password):
+    return await _run_password_task(_hash_password, password)
+
+
+async def verify_password(plain_password, hashed_password):
+    logger.info(f"Verifying password, password pool stats: {password_pool_stats}")
+    return await _run_password_task(_verify_password, plain_password, hashed_password)
@@ -12,7 +12,7 @@ logger = logger_setup.setup_logger(__name__)
 
 # CRUD операции с пользователями
 async def create_user(db: AsyncSession, user: UserCreate):
-    user_password_hash = get_password_hash(user.password)
+    user_password_hash = await get_password_hash(user.password)
     db_user = User(
         username=user.username,
         email=str(user.email),
@@ -30,6 +30,11 @@ async def create_user(db: AsyncSession, user: UserCreate):
 
 
 async def update_user(db: AsyncSession, user_name: str, user: UserUpdate):
+    update_data = user.model_dump(exclude_unset=True)
+    # Хешируем пароль до начала транзакции, чтобы не держать ее открытой
+    if "password" in update_data:
+        password = update_data.pop("password")
+        update_data["hashed_password"] = await get_password_hash(password)
     async with db.begin():
         db_user = await db.execute(select(User).filter(User.username == user_name))
         db_user = db_user.scalar()
@@ -37,12 +42,7 @@ async def update_user(db: AsyncSession, user_name: str, user: UserUpdate):
             logger.error(f"User {user_name} not found.")
             return None
         logger.info(f"Found old user {db_user.to_dict()}")
-        update_data = user.model_dump(exclude_unset=True)
         logger.info(f"Updating user {update_data}")
-        if "password" in update_data:
-            password = update_data.pop("password")
-            update_data["hashed_password"] = get_password_hash(password)
-            logger.info(f"Updated password {update_data['hashed_password']} {password}")
         for key, value in update_data.items():
             setattr(db_user, key, value)
     await db.refresh(db_user)
@@ -90,7 +90,7 @@ async def authenticate_user(db: AsyncSession, identifier: str, password: str):
     if not user:
         logger.error(f"User {identifier} not found.")
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         logger.error(f"User {identifier} dont have correct password.")
         return None
     logger.info(f"Authenticated user {user.to_dict()}")
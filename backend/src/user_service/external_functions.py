@@ -1,6 +1,7 @@
 import httpx
 from httpx import Response
 
+from src.shared.http_client import get_http_client
 from src.shared.logger_setup import setup_logger
 from src.shared.schemas import TokenModelResponse
 from src.user_service.endpoints import CHECK_AUTH, DELETE_USER_SESSIONS
@@ -21,11 +22,11 @@ async def check_auth_from_external_service(access_token: str, skip_auth: bool =
             "X-Skip-Auth": str(skip_auth)
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(CHECK_AUTH, headers=headers)
-            response.raise_for_status()  # Проверяем статусный код на ошибки
-            json_data = response.json()
-            return json_data
+        client = get_http_client()
+        response = await client.get(CHECK_AUTH, headers=headers)
+        response.raise_for_status()  # Проверяем статусный код на ошибки
+        json_data = response.json()
+        return json_data
     except httpx.RequestError as e:
         logger.error(f"An error occurred while requesting {e.request.url!r}.")
     except httpx.HTTPStatusError as e:
@@ -47,8 +48,8 @@ async def delete_user_sessions(access_token: str, skip_auth: bool = False) -> Re
         "X-Skip-Auth": str(skip_auth)
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.delete(DELETE_USER_SESSIONS, headers=headers)
-        logger.info(f"Deleted user sessions with response {response}")
-        return response
+    client = get_http_client()
+    response = await client.delete(DELETE_USER_SESSIONS, headers=headers)
+    logger.info(f"Deleted user sessions with response {response}")
+    return response
 
@@ -1,12 +1,36 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from src.shared.http_client import get_http_client, close_http_client
+from src.shared.local_auth import listen_session_invalidations
 from src.shared.logger_setup import setup_logger
+from src.user_service.auth_functions import shutdown_password_executor
 from src.user_service.router import user_router
 
 logger = setup_logger(__name__)
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Управление жизненным циклом приложения"""
+    get_http_client()
+    logger.info("Started shared http client")
+    invalidations_task = asyncio.create_task(listen_session_invalidations())
+
+    yield  # FastAPI работает здесь
+
+    invalidations_task.cancel()
+    try:
+        await invalidations_task
+    except asyncio.CancelledError:
+        logger.info("Stopped session invalidations listener")
+    await close_http_client()
+    shutdown_password_executor()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(user_router)
 
 
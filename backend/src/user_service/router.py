@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.shared.common_functions import decode_token, verify_response
 from src.shared.database import SessionLocal
+from src.shared.local_auth import verify_token_locally
 from src.shared.logger_setup import setup_logger
 from src.shared.models import User
 from src.shared.schemas import AuthResponse, UserAuthDTO
@@ -33,6 +34,9 @@ async def get_valid_token(request:Request, credentials: HTTPAuthorizationCredent
     if request.headers.get("X-Skip-Auth") == "True":
         logger.info("Skip authentication check")
         return credentials.credentials
+    token = await verify_token_locally(credentials.credentials)
+    if token:
+        return token
     verify_result = await check_auth_from_external_service(credentials.credentials)
     logger.info(f"Verify result {verify_result}")
     if not verify_result or not verify_result["token"]:
@@ -0,0 +1,98 @@
+import datetime
+
+import pytest
+
+pytest.importorskip("celery")
+pytest.importorskip("sqlalchemy")
+
+from src.async_tasks import tasks, worker_logic
+from src.async_tasks.celery_app import app
+from src.shared.config import settings
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+
+    def set(self, key, value, ex=None):
+        self.redis.values[key] = value
+
+    def hincrby(self, key, field, amount):
+        pass
+
+    def execute(self):
+        pass
+
+
+class FakeRedis:
+    def __init__(self, values):
+        self.values = dict(values)
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakeTask:
+    def __init__(self, task_id, user_id):
+        self.user_id = user_id
+        self._data = {"id": task_id, "title": f"task {task_id}", "user_id": user_id,
+                      "fulfilled_date": datetime.datetime.now(datetime.timezone.utc)}
+
+    def to_dict(self):
+        return self._data
+
+
+class FakeSession:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def scalars(self, statement):
+        return [FakeTask(1, 1), FakeTask(2, 1), FakeTask(3, 2)]
+
+
+@pytest.fixture
+def high_water_mark():
+    return (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=5)).isoformat()
+
+
+@pytest.fixture
+def fake_redis(monkeypatch, high_water_mark):
+    redis = FakeRedis({worker_logic.REMIND_HIGH_WATER_MARK_KEY: high_water_mark})
+    monkeypatch.setattr(worker_logic, "redis_client", redis)
+    monkeypatch.setattr(worker_logic, "SyncSessionLocal", FakeSession)
+    monkeypatch.setattr(worker_logic, "sync_flush_kafka", lambda: None)
+    monkeypatch.setattr(tasks, "get_user_chunks", lambda: [(1, 2)])
+    monkeypatch.setattr(settings, "task_remind_worker_mode", "sync")
+    monkeypatch.setattr(settings, "task_remind_repeat_minutes", 0)
+    monkeypatch.setattr(settings, "task_remind_dedup_seconds", 0)
+    monkeypatch.setattr(app.conf, "task_always_eager", True)
+    monkeypatch.setattr(app.conf, "task_eager_propagates", True)
+    return redis
+
+
+def test_window_stays_when_send_fails(monkeypatch, fake_redis, high_water_mark):
+    # Второе сообщение чанка не доставлено
+    results = iter([True, False])
+    monkeypatch.setattr(worker_logic, "sync_send_to_kafka", lambda message: next(results))
+
+    with pytest.raises(RuntimeError):
+        tasks.dispatch_chunks()
+
+    assert fake_redis.get(worker_logic.REMIND_HIGH_WATER_MARK_KEY) == high_water_mark
+
+
+def test_window_moves_when_all_sent(monkeypatch, fake_redis, high_water_mark):
+    monkeypatch.setattr(worker_logic, "sync_send_to_kafka", lambda message: True)
+
+    tasks.dispatch_chunks()
+
+    assert fake_redis.get(worker_logic.REMIND_HIGH_WATER_MARK_KEY) > high_water_mark